@@ -1,29 +1,94 @@
 import frappe
 from frappe import _
+from frappe.utils import cint
 import json
 from datetime import datetime, timedelta
 
+SYSTEM_OVERVIEW_CACHE_KEY = "pos:system_overview"
+SYSTEM_OVERVIEW_CACHE_TTL = 60  # seconds
+
+# SQL templates shared across dashboard calls; keeping the query text
+# identical per call lets the server reuse one cached plan
+_DEVICE_COUNTS_SQL = """
+    SELECT
+        COUNT(*) as total,
+        SUM(CASE WHEN status = 'Active' THEN 1 ELSE 0 END) as active
+    FROM `tabPOS Device`
+"""
+
+_PRICING_COUNTS_SQL = """
+    SELECT
+        COUNT(*) as total,
+        SUM(CASE WHEN disabled = 0 THEN 1 ELSE 0 END) as active
+    FROM `tabPOS Pricing Rule`
+"""
+
+_SYNC_STATS_SQL = """
+    SELECT
+        status,
+        COUNT(*) as count,
+        AVG(TIMESTAMPDIFF(SECOND, creation, completion_time)) as avg_time
+    FROM `tabPOS Sync Log`
+    WHERE creation >= %s
+    GROUP BY status
+"""
+
+_PENDING_SYNCS_SQL = """
+    SELECT
+        device_name,
+        sync_type,
+        COUNT(*) as pending_count,
+        MIN(creation) as oldest_request
+    FROM `tabPOS Sync Log`
+    WHERE status = 'Pending'
+    GROUP BY device_name, sync_type
+    ORDER BY oldest_request
+"""
+
+_HOURLY_STATS_SQL = """
+    SELECT
+        HOUR(creation) as sync_hour,
+        COUNT(*) as total_syncs,
+        SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) as successful_syncs,
+        AVG(CASE WHEN status = 'Success' THEN TIMESTAMPDIFF(SECOND, creation, completion_time) ELSE NULL END) as avg_time
+    FROM `tabPOS Sync Log`
+    WHERE creation >= DATE_SUB(NOW(), INTERVAL 24 HOUR)
+    GROUP BY HOUR(creation)
+    ORDER BY sync_hour
+"""
+
 @frappe.whitelist()
 def get_system_overview():
     """Get system overview for admin dashboard"""
-    
-    # Get system statistics
-    total_devices = frappe.db.count('POS Device')
-    active_devices = frappe.db.count('POS Device', {'status': 'Active'})
-    total_pricing_rules = frappe.db.count('POS Pricing Rule')
-    active_pricing_rules = frappe.db.count('POS Pricing Rule', {'disabled': 0})
-    
-    # Get sync statistics for last 24 hours
+
+    # Serve from cache so concurrent dashboard polls share one DB hit
+    cached = frappe.cache().get_value(SYSTEM_OVERVIEW_CACHE_KEY)
+    if cached:
+        return cached
+
+    # Get system statistics (one aggregate query per table instead of four counts)
+    device_counts = frappe.db.sql(_DEVICE_COUNTS_SQL, as_dict=True)[0]
+    pricing_counts = frappe.db.sql(_PRICING_COUNTS_SQL, as_dict=True)[0]
+
+    total_devices = device_counts.total or 0
+    active_devices = device_counts.active or 0
+    total_pricing_rules = pricing_counts.total or 0
+    active_pricing_rules = pricing_counts.active or 0
+
+    # Get sync statistics for last 24 hours, grouped by status and
+    # pivoted in Python instead of per-row CASE expressions
     yesterday = datetime.now() - timedelta(days=1)
-    sync_stats = frappe.db.sql("""
-        SELECT 
-            COUNT(*) as total_syncs,
-            SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) as successful_syncs,
-            SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) as failed_syncs,
-            AVG(CASE WHEN status = 'Success' THEN TIMESTAMPDIFF(SECOND, creation, completion_time) ELSE NULL END) as avg_sync_time
-        FROM `tabPOS Sync Log`
-        WHERE creation >= %s
-    """, yesterday.strftime('%Y-%m-%d %H:%M:%S'), as_dict=True)[0]
+    sync_rows = frappe.db.sql(_SYNC_STATS_SQL,
+        yesterday.strftime('%Y-%m-%d %H:%M:%S'), as_dict=True)
+
+    status_counts = {row.status: row for row in sync_rows}
+    success_row = status_counts.get('Success')
+    sync_stats = {
+        'total_syncs': sum(row.count for row in sync_rows),
+        'successful_syncs': success_row.count if success_row else 0,
+        'failed_syncs': status_counts['Failed'].count if 'Failed' in status_counts else 0,
+        'avg_sync_time': success_row.avg_time if success_row else None
+    }
     
     # Get error statistics
     error_logs = frappe.get_all('POS Sync Log',
@@ -33,7 +98,7 @@ def get_system_overview():
         limit=10
     )
     
-    return {
+    overview = {
         'device_stats': {
             'total': total_devices,
             'active': active_devices,
@@ -48,53 +113,93 @@ def get_system_overview():
         'error_logs': error_logs
     }
 
+    frappe.cache().set_value(SYSTEM_OVERVIEW_CACHE_KEY, overview,
+        expires_in_sec=SYSTEM_OVERVIEW_CACHE_TTL)
+
+    return overview
+
+def invalidate_system_overview_cache(doc=None, method=None):
+    """Invalidate the cached system overview when devices or sync logs change"""
+    frappe.cache().delete_value(SYSTEM_OVERVIEW_CACHE_KEY)
+
 @frappe.whitelist()
-def get_device_performance_metrics(device_name=None):
-    """Get performance metrics for devices"""
-    
-    where_clause = ""
-    if device_name:
-        where_clause = "WHERE device_name = %s"
-        params = (device_name,)
-    else:
-        params = ()
-    
-    # Get device performance data
-    performance_data = frappe.db.sql(f"""
-        SELECT 
+def get_device_performance_metrics(device_name=None, start=0, page_length=200):
+    """Get performance metrics for devices (paginated)"""
+
+    start = cint(start)
+    page_length = min(cint(page_length) or 200, 500)
+
+    # Get device performance data grouped by device and status, then
+    # pivot in Python instead of per-row CASE expressions. One
+    # parameterized query text serves both call variants, so the server
+    # can reuse a single plan and nothing is interpolated into the SQL.
+    status_rows = frappe.db.sql("""
+        SELECT
             device_name,
-            COUNT(*) as total_syncs,
-            SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) as successful_syncs,
-            SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) as failed_syncs,
-            AVG(CASE WHEN status = 'Success' THEN TIMESTAMPDIFF(SECOND, creation, completion_time) ELSE NULL END) as avg_response_time,
+            status,
+            COUNT(*) as count,
+            AVG(TIMESTAMPDIFF(SECOND, creation, completion_time)) as avg_time,
             MAX(creation) as last_sync
         FROM `tabPOS Sync Log`
-        {where_clause}
-        GROUP BY device_name
-        ORDER BY total_syncs DESC
-    """, params, as_dict=True)
-    
+        WHERE (%(device_name)s IS NULL OR device_name = %(device_name)s)
+        GROUP BY device_name, status
+        ORDER BY device_name, status
+        LIMIT 500
+    """, {"device_name": device_name}, as_dict=True)
+
+    devices = {}
+    for row in status_rows:
+        entry = devices.setdefault(row.device_name, {
+            'device_name': row.device_name,
+            'total_syncs': 0,
+            'successful_syncs': 0,
+            'failed_syncs': 0,
+            'avg_response_time': None,
+            'last_sync': None
+        })
+        entry['total_syncs'] += row.count
+        if row.status == 'Success':
+            entry['successful_syncs'] = row.count
+            entry['avg_response_time'] = row.avg_time
+        elif row.status == 'Failed':
+            entry['failed_syncs'] = row.count
+        if not entry['last_sync'] or row.last_sync > entry['last_sync']:
+            entry['last_sync'] = row.last_sync
+
+    performance_data = sorted(devices.values(),
+        key=lambda d: d['total_syncs'], reverse=True)
+
+    # Return one bounded page instead of materializing the whole fleet
     return {
-        'performance_data': performance_data,
+        'performance_data': performance_data[start:start + page_length],
+        'start': start,
+        'page_length': page_length,
         'timestamp': datetime.now().isoformat()
     }
 
+# Pricing-related sync_type values; an IN list keeps the query
+# index-friendly where a leading-wildcard LIKE would force a full scan
+PRICING_SYNC_TYPES = ("Pricing Calculation", "Bulk Pricing")
+
 @frappe.whitelist()
-def get_pricing_performance_metrics():
-    """Get pricing engine performance metrics"""
-    
+def get_pricing_performance_metrics(start=0, page_length=200):
+    """Get pricing engine performance metrics (paginated)"""
+
+    start = cint(start)
+    page_length = min(cint(page_length) or 200, 500)
+
     # Get pricing calculation statistics
     pricing_stats = frappe.db.sql("""
-        SELECT 
+        SELECT
             sync_type,
             COUNT(*) as total_calculations,
             SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) as successful_calculations,
             AVG(CASE WHEN status = 'Success' THEN TIMESTAMPDIFF(SECOND, creation, completion_time) ELSE NULL END) as avg_calculation_time,
             MAX(creation) as last_calculation
         FROM `tabPOS Sync Log`
-        WHERE sync_type LIKE %s
+        WHERE sync_type IN %s
         GROUP BY sync_type
-    """, ('%Pricing%',), as_dict=True)
+    """, (PRICING_SYNC_TYPES,), as_dict=True)
     
     # Get rule performance
     rule_performance = frappe.db.sql("""
@@ -113,14 +218,18 @@ def get_pricing_performance_metrics():
             END) as avg_discount_applied
         FROM `tabPOS Pricing Rule` pr
         LEFT JOIN `tabPOS Sync Log` sl ON sl.pricing_rule = pr.name
+            AND sl.creation >= DATE_SUB(NOW(), INTERVAL 30 DAY)
         WHERE pr.disabled = 0
         GROUP BY pr.name, pr.rule_name, pr.rule_type
         ORDER BY total_calculations DESC
-    """, as_dict=True)
-    
+        LIMIT %s OFFSET %s
+    """, (page_length, start), as_dict=True)
+
     return {
         'pricing_stats': pricing_stats,
         'rule_performance': rule_performance,
+        'start': start,
+        'page_length': page_length,
         'timestamp': datetime.now().isoformat()
     }
 
@@ -129,70 +238,82 @@ def get_system_health_alerts():
     """Get system health alerts"""
     
     alerts = []
-    
-    # Check for devices not synced in 24 hours
+
+    # One timestamp for the whole request instead of re-formatting
+    # datetime.now() inside every alert loop
+    now_iso = datetime.now().isoformat()
+
+    # Check for devices not synced in 24 hours (severity computed in SQL)
     yesterday = datetime.now() - timedelta(days=1)
-    inactive_devices = frappe.get_all('POS Device',
-        filters={'status': 'Active', 'last_sync': ['<', yesterday]},
-        fields=['name', 'device_name', 'last_sync']
-    )
-    
+    inactive_devices = frappe.db.sql("""
+        SELECT
+            device_name,
+            DATEDIFF(NOW(), last_sync) as days_since_sync,
+            CASE WHEN DATEDIFF(NOW(), last_sync) <= 7 THEN 'warning' ELSE 'critical' END as severity
+        FROM `tabPOS Device`
+        WHERE status = 'Active' AND last_sync < %s
+    """, yesterday, as_dict=True)
+
     for device in inactive_devices:
-        days_since_sync = (datetime.now() - device.last_sync).days
         alerts.append({
             'type': 'device_inactive',
-            'severity': 'warning' if days_since_sync <= 7 else 'critical',
-            'message': f"Device {device.device_name} has not synced for {days_since_sync} days",
+            'severity': device.severity,
+            'message': f"Device {device.device_name} has not synced for {device.days_since_sync} days",
             'device_name': device.device_name,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso
         })
     
-    # Check for high error rates
-    error_rate = frappe.db.sql("""
-        SELECT 
+    # Check error rates and disabled-rule usage with a single pass over
+    # the 24h sync-log window instead of two separate scans
+    log_alerts = frappe.db.sql("""
+        WITH recent AS (
+            SELECT device_name, status, pricing_rule
+            FROM `tabPOS Sync Log`
+            WHERE creation >= %(since)s
+        )
+        SELECT
+            'high_error_rate' as alert_type,
             device_name,
-            COUNT(*) as total_syncs,
-            SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) as failed_syncs,
+            NULL as rule_name,
             (SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) * 100.0 / COUNT(*)) as error_rate
-        FROM `tabPOS Sync Log`
-        WHERE creation >= %s
+        FROM recent
         GROUP BY device_name
         HAVING error_rate > 20
-    """, yesterday.strftime('%Y-%m-%d %H:%M:%S'), as_dict=True)
-    
-    for device in error_rate:
-        alerts.append({
-            'type': 'high_error_rate',
-            'severity': 'warning',
-            'message': f"Device {device.device_name} has {device.error_rate:.1f}% error rate",
-            'device_name': device.device_name,
-            'error_rate': device.error_rate,
-            'timestamp': datetime.now().isoformat()
-        })
-    
-    # Check for disabled pricing rules with recent usage
-    recent_pricing = frappe.db.sql("""
-        SELECT DISTINCT pr.name, pr.rule_name, sl.creation
+        UNION ALL
+        SELECT
+            'disabled_rule_used' as alert_type,
+            NULL as device_name,
+            pr.rule_name,
+            NULL as error_rate
         FROM `tabPOS Pricing Rule` pr
-        INNER JOIN `tabPOS Sync Log` sl ON sl.pricing_rule = pr.name
-        WHERE pr.disabled = 1 
-        AND sl.creation >= %s
-        AND sl.status = 'Success'
-    """, yesterday.strftime('%Y-%m-%d %H:%M:%S'), as_dict=True)
-    
-    for rule in recent_pricing:
-        alerts.append({
-            'type': 'disabled_rule_used',
-            'severity': 'info',
-            'message': f"Disabled pricing rule {rule.rule_name} was recently used",
-            'rule_name': rule.rule_name,
-            'timestamp': datetime.now().isoformat()
-        })
+        INNER JOIN recent r ON r.pricing_rule = pr.name AND r.status = 'Success'
+        WHERE pr.disabled = 1
+        GROUP BY pr.name, pr.rule_name
+    """, {"since": yesterday.strftime('%Y-%m-%d %H:%M:%S')}, as_dict=True)
+
+    for row in log_alerts:
+        if row.alert_type == 'high_error_rate':
+            alerts.append({
+                'type': 'high_error_rate',
+                'severity': 'warning',
+                'message': f"Device {row.device_name} has {row.error_rate:.1f}% error rate",
+                'device_name': row.device_name,
+                'error_rate': row.error_rate,
+                'timestamp': now_iso
+            })
+        else:
+            alerts.append({
+                'type': 'disabled_rule_used',
+                'severity': 'info',
+                'message': f"Disabled pricing rule {row.rule_name} was recently used",
+                'rule_name': row.rule_name,
+                'timestamp': now_iso
+            })
     
     return {
         'alerts': alerts,
         'total_alerts': len(alerts),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': now_iso
     }
 
 @frappe.whitelist()
@@ -200,30 +321,10 @@ def get_sync_queue_status():
     """Get current sync queue status"""
     
     # Get pending sync jobs
-    pending_syncs = frappe.db.sql("""
-        SELECT 
-            device_name,
-            sync_type,
-            COUNT(*) as pending_count,
-            MIN(creation) as oldest_request
-        FROM `tabPOS Sync Log`
-        WHERE status = 'Pending'
-        GROUP BY device_name, sync_type
-        ORDER BY oldest_request
-    """, as_dict=True)
-    
+    pending_syncs = frappe.db.sql(_PENDING_SYNCS_SQL, as_dict=True)
+
     # Get sync performance by hour
-    hourly_stats = frappe.db.sql("""
-        SELECT 
-            HOUR(creation) as sync_hour,
-            COUNT(*) as total_syncs,
-            SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) as successful_syncs,
-            AVG(CASE WHEN status = 'Success' THEN TIMESTAMPDIFF(SECOND, creation, completion_time) ELSE NULL END) as avg_time
-        FROM `tabPOS Sync Log`
-        WHERE creation >= DATE_SUB(NOW(), INTERVAL 24 HOUR)
-        GROUP BY HOUR(creation)
-        ORDER BY sync_hour
-    """, as_dict=True)
+    hourly_stats = frappe.db.sql(_HOURLY_STATS_SQL, as_dict=True)
     
     return {
         'pending_syncs': pending_syncs,
@@ -233,36 +334,63 @@ def get_sync_queue_status():
 
 @frappe.whitelist()
 def trigger_system_maintenance():
-    """Trigger system maintenance tasks"""
-    
+    """Queue system maintenance in a background worker
+
+    The cleanup and statistics rebuild can run for minutes on large
+    logs, so it must not hold an HTTP worker.
+    """
+    job = frappe.enqueue(
+        "erpnext_pos_integration.api.admin_api.run_system_maintenance",
+        queue="long",
+        timeout=1800
+    )
+
+    return {
+        'success': True,
+        'status': 'queued',
+        'job_id': job.id if job else None,
+        'timestamp': datetime.now().isoformat()
+    }
+
+def run_system_maintenance():
+    """Run system maintenance tasks"""
+
     try:
-        # Clean up old sync logs (keep last 30 days)
+        # Clean up old sync logs (keep last 30 days) in bounded chunks so
+        # a large backlog never creates one giant blocking transaction
         cutoff_date = datetime.now() - timedelta(days=30)
-        deleted_logs = frappe.db.sql("""
-            DELETE FROM `tabPOS Sync Log`
-            WHERE creation < %s
-        """, cutoff_date.strftime('%Y-%m-%d %H:%M:%S'))
-        
-        # Recalculate device statistics
+        batch_size = 10000
+        deleted_logs = 0
+        while True:
+            frappe.db.sql("""
+                DELETE FROM `tabPOS Sync Log`
+                WHERE creation < %s
+                LIMIT %s
+            """, (cutoff_date.strftime('%Y-%m-%d %H:%M:%S'), batch_size))
+            batch_deleted = frappe.db._cursor.rowcount
+            frappe.db.commit()
+            deleted_logs += max(batch_deleted, 0)
+            if batch_deleted < batch_size:
+                break
+
+        # Recalculate device statistics with one grouped join instead of
+        # two correlated subqueries per device row
         frappe.db.sql("""
-            UPDATE `tabPOS Device` 
-            SET total_syncs = (
-                SELECT COUNT(*) 
-                FROM `tabPOS Sync Log` 
-                WHERE device_name = `tabPOS Device`.name
-            ),
-            last_sync = (
-                SELECT MAX(creation) 
-                FROM `tabPOS Sync Log` 
-                WHERE device_name = `tabPOS Device`.name
-            )
+            UPDATE `tabPOS Device` d
+            LEFT JOIN (
+                SELECT device_name, COUNT(*) as sync_count, MAX(creation) as last_creation
+                FROM `tabPOS Sync Log`
+                GROUP BY device_name
+            ) s ON s.device_name = d.name
+            SET d.total_syncs = COALESCE(s.sync_count, 0),
+                d.last_sync = s.last_creation
         """)
         
         frappe.db.commit()
         
         return {
             'success': True,
-            'message': f'System maintenance completed. Cleaned up {deleted_logs[0] if deleted_logs else 0} old records.',
+            'message': f'System maintenance completed. Cleaned up {deleted_logs} old records.',
             'timestamp': datetime.now().isoformat()
         }
         
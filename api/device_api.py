@@ -5,7 +5,10 @@ import frappe
 from frappe import _
 from frappe.utils import now, add_hours
 from frappe.core.doctype.user.user import generate_keys
-from erpnext_pos_integration.doctype.pos_device.pos_device import validate_device_credentials
+from erpnext_pos_integration.doctype.pos_device.pos_device import (
+    validate_device_credentials,
+    get_device_by_credentials,
+)
 
 
 @frappe.whitelist()
@@ -62,12 +65,12 @@ def register_device(branch, device_name, registration_code, device_type=None, os
         )
         
         if result["status"] == "success":
-            # Log successful registration
-            frappe.log_error(
-                f"POS Device registered successfully: {device_name} ({result['device_id']})",
-                "POS Device Registration"
+            # Log successful registration to the file logger; log_error
+            # would insert an Error Log row on every registration
+            frappe.logger("pos_device_registration").info(
+                f"POS Device registered successfully: {device_name} ({result['device_id']})"
             )
-            
+
             return {
                 "status": "success",
                 "message": _("Device registered successfully"),
@@ -110,29 +113,25 @@ def health_check(device_id, api_key):
                 "message": _("Missing required parameters: device_id, api_key")
             }
         
-        # Validate device credentials
-        if not validate_device_credentials(device_id, api_key):
+        # Validate credentials and load the device in one lookup
+        device = get_device_by_credentials(device_id, api_key)
+        if not device:
             return {
                 "status": "error",
                 "message": _("Invalid device credentials"),
                 "authenticated": False
             }
-        
-        # Get device information
-        device = frappe.get_doc("POS Device", {"device_id": device_id})
-        if not device:
-            return {
-                "status": "error",
-                "message": _("Device not found")
-            }
-        
+
         # Perform health checks
         health_status = perform_health_checks(device)
         
-        # Update device heartbeat
-        device.mark_online()
-        frappe.db.commit()
-        
+        # Update device heartbeat directly, skipping the full doc save;
+        # the request-end autocommit makes an explicit commit redundant
+        heartbeat_time = now()
+        frappe.db.set_value("POS Device", device.name,
+            {"sync_status": "Online", "last_heartbeat": heartbeat_time},
+            update_modified=False)
+
         return {
             "status": "success",
             "authenticated": True,
@@ -140,7 +139,7 @@ def health_check(device_id, api_key):
                 "device_id": device.device_id,
                 "device_name": device.device_name,
                 "branch": device.branch,
-                "last_heartbeat": device.last_heartbeat
+                "last_heartbeat": heartbeat_time
             },
             "health": health_status,
             "timestamp": now()
@@ -219,26 +218,26 @@ def get_device_status(device_id, api_key):
                 "message": _("Missing required parameters: device_id, api_key")
             }
         
-        # Validate device credentials
-        if not validate_device_credentials(device_id, api_key):
+        # Validate credentials and load the device in one lookup
+        device = get_device_by_credentials(device_id, api_key)
+        if not device:
             return {
                 "status": "error",
                 "message": _("Invalid device credentials")
             }
-        
-        # Get device status
-        from erpnext_pos_integration.doctype.pos_device.pos_device import get_device_status
-        
-        result = get_device_status(device_id)
-        
-        if result["status"] == "success":
-            return {
-                "status": "success",
-                "device": result["device"],
-                "timestamp": now()
-            }
-        else:
-            return result
+
+        return {
+            "status": "success",
+            "device": {
+                "device_id": device.device_id,
+                "device_name": device.device_name,
+                "sync_status": device.sync_status,
+                "last_heartbeat": device.last_heartbeat,
+                "last_sync_at": device.last_sync_at,
+                "is_registered": device.is_registered
+            },
+            "timestamp": now()
+        }
         
     except Exception as e:
         frappe.log_error(f"Device status API error for device {device_id}: {str(e)}", "POS Device Status API")
@@ -254,7 +253,7 @@ def perform_health_checks(device):
     health_checks = {
         "database": check_database_connection(),
         "api_performance": check_api_performance(),
-        "last_sync": get_last_sync_time(device.device_id),
+        "last_sync": get_last_sync_time(device),
         "pending_operations": get_pending_operations_count(device.device_id),
         "system_resources": get_system_resources()
     }
@@ -272,8 +271,26 @@ def perform_health_checks(device):
     return health_checks
 
 
+def _cached_health_probe(key, probe, ttl=15):
+    """Serve a health probe result from Redis for ttl seconds
+
+    get_value has no TTL parameter, so the expiry is applied on the miss
+    path via set_value.
+    """
+    cache = frappe.cache()
+    value = cache.get_value(key)
+    if value is None:
+        value = probe()
+        cache.set_value(key, value, expires_in_sec=ttl)
+    return value
+
+
 def check_database_connection():
-    """Check database connectivity"""
+    """Check database connectivity (cached, results are per-server not per-device)"""
+    return _cached_health_probe("pos:health:db_ok", _check_database_connection)
+
+
+def _check_database_connection():
     try:
         frappe.db.sql("SELECT 1")
         return True
@@ -282,7 +299,11 @@ def check_database_connection():
 
 
 def check_api_performance():
-    """Check API performance (simplified)"""
+    """Check API performance (simplified, cached per-server)"""
+    return _cached_health_probe("pos:health:api_ms", _check_api_performance)
+
+
+def _check_api_performance():
     try:
         import time
         start_time = time.time()
@@ -292,9 +313,8 @@ def check_api_performance():
         return -1
 
 
-def get_last_sync_time(device_id):
-    """Get last sync time for device"""
-    device = frappe.get_doc("POS Device", {"device_id": device_id})
+def get_last_sync_time(device):
+    """Get last sync time from an already-loaded device document"""
     return device.last_sync_at if device and device.last_sync_at else None
 
 
@@ -328,14 +348,20 @@ def get_system_overview():
     try:
         from erpnext_pos_integration.doctype.pos_device.pos_device import get_device_statistics
         from erpnext_pos_integration.doctype.pos_sync_log.pos_sync_log import get_sync_statistics
-        
+
+        # Serve from cache so concurrent dashboard polls share one DB hit
+        cache_key = "pos:device_system_overview"
+        cached = frappe.cache().get_value(cache_key)
+        if cached:
+            return cached
+
         # Get device statistics
         device_stats = get_device_statistics()
-        
+
         # Get sync statistics
         sync_stats = get_sync_statistics(time_range="24h")
-        
-        return {
+
+        result = {
             "status": "success",
             "overview": {
                 "devices": device_stats,
@@ -343,6 +369,10 @@ def get_system_overview():
                 "timestamp": now()
             }
         }
+
+        frappe.cache().set_value(cache_key, result, expires_in_sec=60)
+
+        return result
         
     except Exception as e:
         frappe.log_error(f"System overview API error: {str(e)}", "POS System Overview API")
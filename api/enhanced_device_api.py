@@ -7,10 +7,11 @@ def test_device_connection(device_name):
     """Test connection to a specific device"""
     
     try:
-        device = frappe.get_doc("POS Device", device_name)
+        device = frappe.db.get_value("POS Device", device_name,
+            ["device_name", "device_type"], as_dict=True)
         if not device:
             return {"success": False, "error": "Device not found"}
-        
+
         # Simulate connection test
         # In real implementation, this would attempt actual connection
         connection_result = {
@@ -20,14 +21,15 @@ def test_device_connection(device_name):
             "response_time": 150,  # milliseconds
             "timestamp": datetime.now().isoformat()
         }
-        
-        # Update device last sync time
-        device.last_sync = datetime.now()
-        device.save()
+
+        # Update device last sync time directly, skipping the full doc
+        # load and save cycle
+        frappe.db.set_value("POS Device", device_name, "last_sync",
+            datetime.now(), update_modified=False)
         frappe.db.commit()
-        
+
         return {"success": True, "result": connection_result}
-        
+
     except Exception as e:
         return {"success": False, "error": str(e)}
 
@@ -36,29 +38,29 @@ def sync_device_data(device_name, sync_type="Full Sync"):
     """Sync data with a specific device"""
     
     try:
-        device = frappe.get_doc("POS Device", device_name)
-        if not device:
+        device_display_name = frappe.db.get_value("POS Device", device_name, "device_name")
+        if not device_display_name:
             return {"success": False, "error": "Device not found"}
-        
+
         # Create sync log entry
         sync_log = frappe.get_doc({
             "doctype": "POS Sync Log",
-            "device_name": device.device_name,
+            "device_name": device_display_name,
             "sync_type": sync_type,
             "status": "Pending",
             "creation": datetime.now()
         })
         sync_log.insert()
-        
+
         # Simulate sync process
         # In real implementation, this would trigger actual sync
         sync_log.status = "Success"
         sync_log.completion_time = datetime.now()
         sync_log.save()
-        
-        # Update device last sync
-        device.last_sync = datetime.now()
-        device.save()
+
+        # Update device last sync directly instead of a full save()
+        frappe.db.set_value("POS Device", device_name, "last_sync",
+            datetime.now(), update_modified=False)
         frappe.db.commit()
         
         return {"success": True, "message": "Device sync completed"}
@@ -67,25 +69,91 @@ def sync_device_data(device_name, sync_type="Full Sync"):
         frappe.db.rollback()
         return {"success": False, "error": str(e)}
 
+def _build_sync_log_row(device, sync_type, sync_time, user):
+    """Build one POS Sync Log row tuple from an already-fetched device dict
+
+    Works on the plain dict returned by frappe.get_all so bulk sync never
+    re-loads device docs inside the loop.
+    """
+    return (
+        frappe.generate_hash(length=10),
+        device.device_name,
+        sync_type,
+        "Success",
+        sync_time,
+        sync_time,
+        user,
+        sync_time,
+        user
+    )
+
+
 @frappe.whitelist()
 def sync_all_devices():
+    """Queue a sync of all active devices in a background worker"""
+
+    job = frappe.enqueue(
+        "erpnext_pos_integration.api.enhanced_device_api.run_sync_all_devices",
+        queue="long",
+        timeout=1800
+    )
+
+    return {
+        "success": True,
+        "status": "queued",
+        "job_id": job.id if job else None
+    }
+
+
+def run_sync_all_devices():
     """Sync data with all active devices"""
-    
+
     try:
-        active_devices = frappe.get_all("POS Device", 
+        active_devices = frappe.get_all("POS Device",
             filters={"status": "Active"},
             fields=["name", "device_name"]
         )
-        
-        results = []
-        for device in active_devices:
-            result = sync_device_data(device.name, "Bulk Sync")
-            results.append({
+
+        if not active_devices:
+            return {"success": True, "results": []}
+
+        sync_time = datetime.now()
+        user = frappe.session.user
+
+        # Build all sync log rows in memory and insert them in one statement
+        # instead of one insert + two saves per device
+        log_rows = [
+            _build_sync_log_row(device, "Bulk Sync", sync_time, user)
+            for device in active_devices
+        ]
+
+        frappe.db.bulk_insert(
+            "POS Sync Log",
+            fields=["name", "device_name", "sync_type", "status", "creation",
+                    "completion_time", "owner", "modified", "modified_by"],
+            values=log_rows
+        )
+
+        # Update all device last_sync timestamps in a single UPDATE
+        device_names = tuple(device.name for device in active_devices)
+        frappe.db.sql("""
+            UPDATE `tabPOS Device`
+            SET last_sync = %s
+            WHERE name IN %s
+        """, (sync_time, device_names))
+
+        frappe.db.commit()
+
+        results = [
+            {
                 "device_name": device.device_name,
-                "result": result
-            })
-        
+                "result": {"success": True, "message": "Device sync completed"}
+            }
+            for device in active_devices
+        ]
+
         return {"success": True, "results": results}
-        
+
     except Exception as e:
+        frappe.db.rollback()
         return {"success": False, "error": str(e)}
\ No newline at end of file
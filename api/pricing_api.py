@@ -4,13 +4,174 @@
 import frappe
 from frappe import _
 from frappe.utils import now, flt
-from erpnext_pos_integration.utils.pricing_engine import PricingEngine
-from erpnext_pos_integration.doctype.pos_device.pos_device import validate_device_credentials
+from erpnext_pos_integration.utils.pricing_engine import get_pricing_engine
+from erpnext_pos_integration.utils.security import safe_eq
+import hashlib
 import json
+import operator
+import threading
 import time
+from concurrent.futures import Future
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+DEVICE_CONTEXT_CACHE = "pos_device_ctx"
+LOG_BUFFER_FLUSH_SIZE = 50
+MAX_BULK_ITEMS = 50
+# Generous per-item allowance; anything bigger cannot be a valid batch
+MAX_BULK_PAYLOAD_CHARS = MAX_BULK_ITEMS * 2048
+
+LOG_BUFFER_KEY = "pos_pricing_log_buffer"
+
+_inflight_requests = {}
+_inflight_lock = threading.Lock()
+
+
+def _bulk_request_hash(device_id, items_data, customer, branch_id):
+    """Stable digest of a normalized bulk pricing request"""
+    payload = json.dumps(
+        [device_id,
+         sorted(items_data, key=lambda item: item['item_code']),
+         customer, branch_id],
+        sort_keys=True, default=str)
+    return "pos:bulk:" + hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _single_flight(cache_key, compute):
+    """Coalesce identical concurrent computations into one
+
+    Simultaneous callers with the same key share a single Future, and the
+    result is kept in Redis for 2s so immediate retries reuse it without
+    noticeably staling the prices.
+    """
+    cached = frappe.cache().get_value(cache_key)
+    if cached is not None:
+        return cached
+
+    with _inflight_lock:
+        future = _inflight_requests.get(cache_key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight_requests[cache_key] = future
+
+    if not is_owner:
+        return future.result()
+
+    try:
+        result = compute()
+        frappe.cache().set_value(cache_key, result, expires_in_sec=2)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_requests.pop(cache_key, None)
+
+
+def _get_device_context(device_id):
+    """Get the device fields used by the pricing API, cached in Redis
+
+    The endpoints only need name, device_name, branch and is_registered,
+    so there is no reason to load the full doc from the DB per request.
+    Invalidated from the POS Device on_update/on_trash hooks.
+    """
+    return frappe.cache().hget(DEVICE_CONTEXT_CACHE, device_id,
+        generator=lambda: frappe.db.get_value("POS Device",
+            {"device_id": device_id},
+            ["name", "device_name", "branch", "is_registered", "api_key"],
+            as_dict=True))
+
+
+def _auth_and_load(device_id, api_key):
+    """Authenticate a device and return its context in a single lookup
+
+    Fuses validate_device_credentials with the follow-up device fetch so
+    each endpoint costs one (cached) lookup instead of two queries. The
+    API key is compared in constant time to avoid timing leaks.
+    """
+    device = _get_device_context(device_id)
+    if not device or not device.is_registered or not device.api_key:
+        return None
+
+    if not safe_eq(device.api_key, api_key):
+        return None
+
+    return device
+
+
+def invalidate_device_context_cache(doc, method=None):
+    """Drop the cached device context when a POS Device changes"""
+    if doc.get("device_id"):
+        frappe.cache().hdel(DEVICE_CONTEXT_CACHE, doc.device_id)
+
+
+def _buffer_pricing_log(device_id, item_code, final_price, rule):
+    """Stage one successful-calculation log line for batched insertion
+
+    The flush job runs in an RQ worker — a different process — so the
+    staging area lives in Redis (like the heartbeat staging) rather
+    than in this web worker's memory, where the job could never see it.
+    """
+    cache = frappe.cache()
+    try:
+        buffered = cache.rpush(
+            cache.make_key(LOG_BUFFER_KEY),
+            json.dumps([device_id, item_code, final_price, rule], default=str)
+        )
+    except Exception:
+        # Logging is best-effort; never fail the pricing call over it
+        return
+
+    if buffered >= LOG_BUFFER_FLUSH_SIZE:
+        frappe.enqueue(
+            "erpnext_pos_integration.api.pricing_api.flush_pricing_logs",
+            queue="short",
+            enqueue_after_commit=False
+        )
+
+
+def flush_pricing_logs():
+    """Drain the Redis-staged pricing log lines into Error Log in one insert"""
+    cache = frappe.cache()
+    buffer_key = cache.make_key(LOG_BUFFER_KEY)
+
+    rows = []
+    while True:
+        entry = cache.lpop(buffer_key)
+        if entry is None:
+            break
+        rows.append(json.loads(entry))
+
+    if not rows:
+        return
+
+    now_ts = now()
+    user = frappe.session.user
+    values = [
+        (frappe.generate_hash(length=10), now_ts, now_ts, user, user,
+         "POS Pricing Calculation",
+         f"Price calculated successfully for device {device_id}, item {item_code}: "
+         f"${final_price} (rule: {rule or 'none'})")
+        for device_id, item_code, final_price, rule in rows
+    ]
+
+    frappe.db.bulk_insert(
+        "Error Log",
+        fields=["name", "creation", "modified", "modified_by", "owner", "method", "error"],
+        values=values
+    )
+    frappe.db.commit()
+
 
 @frappe.whitelist()
-def calculate_price(device_id, api_key, item_code, base_price, quantity=1, 
+def calculate_price(device_id, api_key, item_code, base_price, quantity=1,
                    total_amount=0, customer=None, branch_id=None):
     """
     Calculate final price using 8-level pricing engine
@@ -30,6 +191,9 @@ def calculate_price(device_id, api_key, item_code, base_price, quantity=1,
     """
     
     try:
+        # One timestamp per request, reused across the response
+        request_time = now()
+
         # Input validation
         if not all([device_id, api_key, item_code, base_price]):
             return {
@@ -38,8 +202,9 @@ def calculate_price(device_id, api_key, item_code, base_price, quantity=1,
                 "authenticated": False
             }
         
-        # Validate device credentials
-        if not validate_device_credentials(device_id, api_key):
+        # Authenticate and load device context in one lookup
+        device = _auth_and_load(device_id, api_key)
+        if not device:
             return {
                 "status": "error",
                 "message": _("Invalid device credentials"),
@@ -58,24 +223,15 @@ def calculate_price(device_id, api_key, item_code, base_price, quantity=1,
                 "authenticated": True
             }
         
-        # Get device context
-        device = frappe.get_doc("POS Device", {"device_id": device_id})
-        if not device:
-            return {
-                "status": "error",
-                "message": _("Device not found"),
-                "authenticated": True
-            }
-        
         # Use branch from device if not provided
         if not branch_id and device.branch:
             branch_id = device.branch
         
         # Initialize pricing engine
-        pricing_engine = PricingEngine()
+        pricing_engine = get_pricing_engine()
         
         # Calculate price
-        start_time = time.time()
+        start_time = time.perf_counter()
         price_result = pricing_engine.calculate_price(
             item_code=item_code,
             base_price=base_price,
@@ -85,7 +241,7 @@ def calculate_price(device_id, api_key, item_code, base_price, quantity=1,
             branch_id=branch_id,
             device_id=device_id
         )
-        calculation_time = time.time() - start_time
+        calculation_time = time.perf_counter() - start_time
         
         # Build response
         response = {
@@ -97,24 +253,24 @@ def calculate_price(device_id, api_key, item_code, base_price, quantity=1,
             "item_code": item_code,
             "calculation_time_ms": round(calculation_time * 1000, 2),
             "price_data": price_result,
-            "timestamp": now()
+            "timestamp": request_time
         }
         
         # Add performance warning if calculation is slow
         if calculation_time > 0.5:
             response["performance_warning"] = "Price calculation slower than expected"
         
-        # Log successful calculation
-        frappe.log_error(
-            f"Price calculated successfully for device {device_id}, item {item_code}: "
-            f"${price_result['final_price']} (rule: {price_result.get('rule_applied', 'none')})",
-            "POS Pricing Calculation"
-        )
+        # Log successful calculation via the batched buffer, opt-in only —
+        # successful calcs rarely need a per-row audit trail
+        if frappe.conf.get("log_successful_pricing"):
+            _buffer_pricing_log(device_id, item_code,
+                price_result['final_price'], price_result.get('rule_applied'))
         
         return response
         
     except Exception as e:
-        frappe.log_error(f"Price calculation API error for device {device_id}: {str(e)}", "POS Pricing API")
+        frappe.log_error(f"Price calculation API error for device {device_id}: {str(e)}", "POS Pricing API",
+            reference_doctype="POS Device", reference_name=device_id)
         return {
             "status": "error",
             "message": _("Internal server error during price calculation"),
@@ -139,6 +295,9 @@ def get_pricing_rules(device_id, api_key, item_code=None, branch_id=None, custom
     """
     
     try:
+        # One timestamp per request, reused across the response
+        request_time = now()
+
         # Input validation
         if not all([device_id, api_key]):
             return {
@@ -147,23 +306,15 @@ def get_pricing_rules(device_id, api_key, item_code=None, branch_id=None, custom
                 "authenticated": False
             }
         
-        # Validate device credentials
-        if not validate_device_credentials(device_id, api_key):
+        # Authenticate and load device context in one lookup
+        device = _auth_and_load(device_id, api_key)
+        if not device:
             return {
                 "status": "error",
                 "message": _("Invalid device credentials"),
                 "authenticated": False
             }
         
-        # Get device context
-        device = frappe.get_doc("POS Device", {"device_id": device_id})
-        if not device:
-            return {
-                "status": "error",
-                "message": _("Device not found"),
-                "authenticated": True
-            }
-        
         # Use branch from device if not provided
         if not branch_id and device.branch:
             branch_id = device.branch
@@ -179,33 +330,22 @@ def get_pricing_rules(device_id, api_key, item_code=None, branch_id=None, custom
             total_amount=0  # Default total
         )
         
-        # Format rules for response
+        # Project the response fields in one query instead of copying 22
+        # attributes per doc in a Python loop
         formatted_rules = []
-        for rule in rules:
-            formatted_rules.append({
-                "name": rule.name,
-                "rule_name": rule.rule_name,
-                "pricing_type": rule.pricing_type,
-                "priority_level": rule.priority_level,
-                "erpnext_priority": rule.erpnext_priority,
-                "is_active": rule.is_active,
-                "valid_from": rule.valid_from,
-                "valid_upto": rule.valid_upto,
-                "item_code": rule.item_code,
-                "item_group": rule.item_group,
-                "brand": rule.brand,
-                "customer": rule.customer,
-                "customer_group": rule.customer_group,
-                "territory": rule.territory,
-                "base_price": rule.base_price,
-                "discount_percentage": rule.discount_percentage,
-                "discount_amount": rule.discount_amount,
-                "min_quantity": rule.min_quantity,
-                "max_quantity": rule.max_quantity,
-                "min_spend_amount": rule.min_spend_amount,
-                "bxgy_buy_qty": rule.bxgy_buy_qty,
-                "bxgy_get_qty": rule.bxgy_get_qty
-            })
+        if rules:
+            formatted_rules = frappe.db.sql("""
+                SELECT
+                    name, rule_name, pricing_type, priority_level,
+                    erpnext_priority, is_active, valid_from, valid_upto,
+                    item_code, item_group, brand, customer, customer_group,
+                    territory, base_price, discount_percentage,
+                    discount_amount, min_quantity, max_quantity,
+                    min_spend_amount, bxgy_buy_qty, bxgy_get_qty
+                FROM `tabPOS Pricing Rule`
+                WHERE name IN %(names)s
+                ORDER BY erpnext_priority DESC
+            """, {"names": tuple(rule.name for rule in rules)}, as_dict=True)
         
         return {
             "status": "success",
@@ -217,11 +357,12 @@ def get_pricing_rules(device_id, api_key, item_code=None, branch_id=None, custom
             "customer": customer,
             "rules_count": len(formatted_rules),
             "rules": formatted_rules,
-            "timestamp": now()
+            "timestamp": request_time
         }
         
     except Exception as e:
-        frappe.log_error(f"Get pricing rules API error for device {device_id}: {str(e)}", "POS Pricing Rules API")
+        frappe.log_error(f"Get pricing rules API error for device {device_id}: {str(e)}", "POS Pricing Rules API",
+            reference_doctype="POS Device", reference_name=device_id)
         return {
             "status": "error",
             "message": _("Internal server error while fetching pricing rules"),
@@ -243,6 +384,9 @@ def validate_pricing(device_id, api_key):
     """
     
     try:
+        # One timestamp per request, reused across the response
+        request_time = now()
+
         # Input validation
         if not all([device_id, api_key]):
             return {
@@ -251,25 +395,17 @@ def validate_pricing(device_id, api_key):
                 "authenticated": False
             }
         
-        # Validate device credentials
-        if not validate_device_credentials(device_id, api_key):
+        # Authenticate and load device context in one lookup
+        device = _auth_and_load(device_id, api_key)
+        if not device:
             return {
                 "status": "error",
                 "message": _("Invalid device credentials"),
                 "authenticated": False
             }
         
-        # Get device context
-        device = frappe.get_doc("POS Device", {"device_id": device_id})
-        if not device:
-            return {
-                "status": "error",
-                "message": _("Device not found"),
-                "authenticated": True
-            }
-        
         # Validate pricing engine configuration
-        pricing_engine = PricingEngine()
+        pricing_engine = get_pricing_engine()
         engine_status = pricing_engine.validate_pricing_configuration()
         
         # Test price calculation with sample data
@@ -301,7 +437,7 @@ def validate_pricing(device_id, api_key):
                 "statistics": engine_status.get('statistics', {}),
                 "test_calculation": test_result
             },
-            "timestamp": now()
+            "timestamp": request_time
         }
         
         # Add overall health status
@@ -315,7 +451,8 @@ def validate_pricing(device_id, api_key):
         return validation_status
         
     except Exception as e:
-        frappe.log_error(f"Pricing validation API error for device {device_id}: {str(e)}", "POS Pricing Validation API")
+        frappe.log_error(f"Pricing validation API error for device {device_id}: {str(e)}", "POS Pricing Validation API",
+            reference_doctype="POS Device", reference_name=device_id)
         return {
             "status": "error",
             "message": _("Internal server error during pricing validation"),
@@ -340,6 +477,9 @@ def calculate_bulk_prices(device_id, api_key, items_data, customer=None, branch_
     """
     
     try:
+        # One timestamp per request, reused across the response
+        request_time = now()
+
         # Input validation
         if not all([device_id, api_key, items_data]):
             return {
@@ -348,32 +488,40 @@ def calculate_bulk_prices(device_id, api_key, items_data, customer=None, branch_
                 "authenticated": False
             }
         
-        # Validate device credentials
-        if not validate_device_credentials(device_id, api_key):
+        # Authenticate and load device context in one lookup
+        device = _auth_and_load(device_id, api_key)
+        if not device:
             return {
                 "status": "error",
                 "message": _("Invalid device credentials"),
                 "authenticated": False
             }
         
-        # Parse items_data
-        if isinstance(items_data, str):
+        # Parse items_data, rejecting oversized payloads before paying the
+        # JSON parse cost; already-deserialized lists skip this entirely
+        if isinstance(items_data, (str, bytes)):
+            if len(items_data) > MAX_BULK_PAYLOAD_CHARS:
+                return {
+                    "status": "error",
+                    "message": _("Too many items. Maximum 50 items allowed per request"),
+                    "authenticated": True
+                }
             try:
-                items_data = json.loads(items_data)
-            except json.JSONDecodeError:
+                items_data = _loads(items_data)
+            except ValueError:
                 return {
                     "status": "error",
                     "message": _("Invalid items_data JSON format"),
                     "authenticated": True
                 }
-        
+
         if not isinstance(items_data, list):
             return {
                 "status": "error",
                 "message": _("items_data must be a list"),
                 "authenticated": True
             }
-        
+
         # Validate items_data structure
         if len(items_data) == 0:
             return {
@@ -381,47 +529,30 @@ def calculate_bulk_prices(device_id, api_key, items_data, customer=None, branch_
                 "message": _("items_data cannot be empty"),
                 "authenticated": True
             }
-        
-        if len(items_data) > 50:  # Limit to prevent performance issues
+
+        if len(items_data) > MAX_BULK_ITEMS:  # Limit to prevent performance issues
             return {
                 "status": "error",
                 "message": _("Too many items. Maximum 50 items allowed per request"),
                 "authenticated": True
             }
-        
-        # Validate each item in the list
-        for i, item in enumerate(items_data):
-            if not isinstance(item, dict):
-                return {
-                    "status": "error",
-                    "message": f"Item {i+1} must be a dictionary",
-                    "authenticated": True
-                }
-            
-            if 'item_code' not in item or 'base_price' not in item:
-                return {
-                    "status": "error",
-                    "message": f"Item {i+1} must contain 'item_code' and 'base_price'",
-                    "authenticated": True
-                }
-            
-            # Convert numeric fields
-            try:
-                item['base_price'] = flt(item['base_price'])
-                item['quantity'] = flt(item.get('quantity', 1))
-            except (ValueError, TypeError):
-                return {
-                    "status": "error",
-                    "message": f"Invalid numeric values in item {i+1}",
-                    "authenticated": True
-                }
-        
-        # Get device context
-        device = frappe.get_doc("POS Device", {"device_id": device_id})
-        if not device:
+
+        # Validate and transpose in one pass: the row dicts become three
+        # parallel columns for the engine, with the exception handling
+        # hoisted out of the loop; itemgetter raises on any item that is
+        # not a dict with both required keys
+        get_required = operator.itemgetter('item_code', 'base_price')
+        item_codes, base_prices, quantities = [], [], []
+        try:
+            for item in items_data:
+                item_code, base_price = get_required(item)
+                item_codes.append(item_code)
+                base_prices.append(flt(base_price))
+                quantities.append(flt(item.get('quantity', 1)))
+        except (KeyError, TypeError, ValueError):
             return {
                 "status": "error",
-                "message": _("Device not found"),
+                "message": _("Each item must be a dictionary with 'item_code' and a numeric 'base_price'"),
                 "authenticated": True
             }
         
@@ -429,14 +560,24 @@ def calculate_bulk_prices(device_id, api_key, items_data, customer=None, branch_
         if not branch_id and device.branch:
             branch_id = device.branch
         
-        # Calculate bulk prices
-        pricing_engine = PricingEngine()
-        bulk_results = pricing_engine.calculate_bulk_prices(
-            items_data=items_data,
-            customer=customer,
-            branch_id=branch_id,
-            device_id=device_id
-        )
+        def compute():
+            # The engine prefetches candidate rules for the whole batch
+            # itself (one query in _prefetch_rules_for_batch); the API
+            # only hands over the columns
+            pricing_engine = get_pricing_engine()
+            return pricing_engine.calculate_prices_columnar(
+                item_codes=item_codes,
+                base_prices=base_prices,
+                quantities=quantities,
+                customer=customer,
+                branch_id=branch_id,
+                device_id=device_id
+            )
+
+        # Coalesce identical concurrent requests (retries, double-taps)
+        # into one computation
+        request_hash = _bulk_request_hash(device_id, items_data, customer, branch_id)
+        bulk_results = _single_flight(request_hash, compute)
         
         # Build response
         response = {
@@ -448,7 +589,7 @@ def calculate_bulk_prices(device_id, api_key, items_data, customer=None, branch_
             "customer": customer,
             "items_processed": len(items_data),
             "bulk_calculation": bulk_results,
-            "timestamp": now()
+            "timestamp": request_time
         }
         
         # Add performance warnings
@@ -459,7 +600,8 @@ def calculate_bulk_prices(device_id, api_key, items_data, customer=None, branch_
         return response
         
     except Exception as e:
-        frappe.log_error(f"Bulk pricing API error for device {device_id}: {str(e)}", "POS Bulk Pricing API")
+        frappe.log_error(f"Bulk pricing API error for device {device_id}: {str(e)}", "POS Bulk Pricing API",
+            reference_doctype="POS Device", reference_name=device_id)
         return {
             "status": "error",
             "message": _("Internal server error during bulk price calculation"),
@@ -481,6 +623,9 @@ def clear_pricing_cache(device_id, api_key):
     """
     
     try:
+        # One timestamp per request, reused across the response
+        request_time = now()
+
         # Input validation
         if not all([device_id, api_key]):
             return {
@@ -489,8 +634,9 @@ def clear_pricing_cache(device_id, api_key):
                 "authenticated": False
             }
         
-        # Validate device credentials
-        if not validate_device_credentials(device_id, api_key):
+        # Authenticate and load device context in one lookup
+        device = _auth_and_load(device_id, api_key)
+        if not device:
             return {
                 "status": "error",
                 "message": _("Invalid device credentials"),
@@ -506,11 +652,12 @@ def clear_pricing_cache(device_id, api_key):
             "authenticated": True,
             "device_id": device_id,
             "cache_clear_result": cache_result,
-            "timestamp": now()
+            "timestamp": request_time
         }
         
     except Exception as e:
-        frappe.log_error(f"Clear cache API error for device {device_id}: {str(e)}", "POS Cache Clear API")
+        frappe.log_error(f"Clear cache API error for device {device_id}: {str(e)}", "POS Cache Clear API",
+            reference_doctype="POS Device", reference_name=device_id)
         return {
             "status": "error",
             "message": _("Internal server error during cache clear"),
@@ -5,14 +5,22 @@ from frappe import _
 def get_dashboard_data():
     """Get dashboard data for POS Integration Bridge App"""
     
-    # Get device statistics
-    total_devices = frappe.db.count('POS Device')
-    active_devices = frappe.db.count('POS Device', {'status': 'Active'})
-    inactive_devices = frappe.db.count('POS Device', {'status': 'Inactive'})
-    
-    # Get pricing rule statistics
-    total_pricing_rules = frappe.db.count('POS Pricing Rule')
-    active_pricing_rules = frappe.db.count('POS Pricing Rule', {'disabled': 0})
+    # Get device statistics in one aggregate instead of three counts
+    device_stats = frappe.db.sql("""
+        SELECT
+            COUNT(*) as total,
+            SUM(status = 'Active') as active,
+            SUM(status = 'Inactive') as inactive
+        FROM `tabPOS Device`
+    """, as_dict=True)[0]
+
+    # Get pricing rule statistics the same way
+    pricing_stats = frappe.db.sql("""
+        SELECT
+            COUNT(*) as total,
+            SUM(disabled = 0) as active
+        FROM `tabPOS Pricing Rule`
+    """, as_dict=True)[0]
     
     # Get recent sync logs
     recent_logs = frappe.get_all('POS Sync Log', 
@@ -33,15 +41,8 @@ def get_dashboard_data():
     """, today, as_dict=True)[0]
     
     return {
-        'device_stats': {
-            'total': total_devices,
-            'active': active_devices,
-            'inactive': inactive_devices
-        },
-        'pricing_stats': {
-            'total': total_pricing_rules,
-            'active': active_pricing_rules
-        },
+        'device_stats': device_stats,
+        'pricing_stats': pricing_stats,
         'sync_stats': sync_stats,
         'recent_logs': recent_logs
     }
@@ -50,43 +51,27 @@ def get_dashboard_data():
 def get_device_health_summary():
     """Get device health summary for dashboard"""
     
-    devices = frappe.get_all('POS Device', 
-        fields=['name', 'device_name', 'device_type', 'location', 'status', 'last_sync'],
-        order_by='creation desc'
-    )
-    
-    health_summary = []
-    for device in devices:
-        # Calculate device health status
-        last_sync = device.last_sync
-        status = device.status
-        
-        if status == 'Inactive':
-            health_status = 'Offline'
-            health_color = 'red'
-        elif not last_sync:
-            health_status = 'No Sync Data'
-            health_color = 'orange'
-        else:
-            import datetime
-            last_sync_date = frappe.utils.getdate(last_sync)
-            days_since_sync = (frappe.utils.today_date() - last_sync_date).days
-            
-            if days_since_sync <= 1:
-                health_status = 'Healthy'
-                health_color = 'green'
-            elif days_since_sync <= 7:
-                health_status = 'Warning'
-                health_color = 'orange'
-            else:
-                health_status = 'Critical'
-                health_color = 'red'
-        
-        device['health_status'] = health_status
-        device['health_color'] = health_color
-        health_summary.append(device)
-    
-    return health_summary
+    # Classify health in SQL so there is no per-device Python date math
+    return frappe.db.sql("""
+        SELECT
+            name, device_name, device_type, location, status, last_sync,
+            CASE
+                WHEN status = 'Inactive' THEN 'Offline'
+                WHEN last_sync IS NULL THEN 'No Sync Data'
+                WHEN DATEDIFF(CURDATE(), last_sync) <= 1 THEN 'Healthy'
+                WHEN DATEDIFF(CURDATE(), last_sync) <= 7 THEN 'Warning'
+                ELSE 'Critical'
+            END as health_status,
+            CASE
+                WHEN status = 'Inactive' THEN 'red'
+                WHEN last_sync IS NULL THEN 'orange'
+                WHEN DATEDIFF(CURDATE(), last_sync) <= 1 THEN 'green'
+                WHEN DATEDIFF(CURDATE(), last_sync) <= 7 THEN 'orange'
+                ELSE 'red'
+            END as health_color
+        FROM `tabPOS Device`
+        ORDER BY creation DESC
+    """, as_dict=True)
 
 @frappe.whitelist()
 def get_pricing_performance():
@@ -102,7 +87,8 @@ def get_pricing_performance():
     
     success_rate = 0
     if recent_calculations:
-        successful = len([log for log in recent_calculations if log.status == 'Success'])
+        # Single pass, no intermediate list allocation
+        successful = sum(1 for log in recent_calculations if log.status == 'Success')
         success_rate = (successful / len(recent_calculations)) * 100
     
     return {
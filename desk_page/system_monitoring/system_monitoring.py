@@ -1,41 +1,84 @@
+import functools
+
 import frappe
 from frappe import _
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+from api.admin_api import (
+    get_system_overview,
+    get_device_performance_metrics,
+    get_pricing_performance_metrics,
+    get_system_health_alerts,
+    get_sync_queue_status,
+)
+
+
+def redis_cache(key, ttl):
+    """Serve the wrapped function from Redis for ttl seconds
+
+    Dashboard pollers call these endpoints with identical arguments, so a
+    short shared TTL collapses the polling fanout to one query per window
+    without perceptibly changing freshness.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper():
+            # get_value has no TTL parameter, so the expiry is applied on
+            # the miss path via set_value
+            cache = frappe.cache()
+            value = cache.get_value(key)
+            if value is None:
+                value = fn()
+                cache.set_value(key, value, expires_in_sec=ttl)
+            return value
+        return wrapper
+    return decorator
+
+
+def _run_on_site(site, fn):
+    """Run one dashboard section on a worker thread
+
+    frappe.local — and the DB connection hanging off it — is
+    thread-local, so a bare pool worker has no site context; each worker
+    opens its own connection for the duration of the call.
+    """
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        return fn()
+    finally:
+        frappe.destroy()
+
+
 @frappe.whitelist()
+@redis_cache("pos:monitoring_dashboard", ttl=30)
 def get_monitoring_dashboard():
     """Get comprehensive monitoring dashboard data"""
-    
-    # Get system overview
-    from api.admin_api import get_system_overview
-    system_overview = get_system_overview()
-    
-    # Get device performance metrics
-    from api.admin_api import get_device_performance_metrics
-    device_performance = get_device_performance_metrics()
-    
-    # Get pricing performance
-    from api.admin_api import get_pricing_performance_metrics
-    pricing_performance = get_pricing_performance_metrics()
-    
-    # Get system health alerts
-    from api.admin_api import get_system_health_alerts
-    health_alerts = get_system_health_alerts()
-    
-    # Get sync queue status
-    from api.admin_api import get_sync_queue_status
-    sync_queue = get_sync_queue_status()
-    
+
+    # The five sections are independent DB-bound calls; running them on a
+    # thread pool makes the endpoint cost its slowest query, not the sum.
+    # The site name is captured here because the workers cannot read it
+    # from this request's thread-local state.
+    site = frappe.local.site
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        system_overview = executor.submit(_run_on_site, site, get_system_overview)
+        device_performance = executor.submit(_run_on_site, site, get_device_performance_metrics)
+        pricing_performance = executor.submit(_run_on_site, site, get_pricing_performance_metrics)
+        health_alerts = executor.submit(_run_on_site, site, get_system_health_alerts)
+        sync_queue = executor.submit(_run_on_site, site, get_sync_queue_status)
+
     return {
-        'system_overview': system_overview,
-        'device_performance': device_performance,
-        'pricing_performance': pricing_performance,
-        'health_alerts': health_alerts,
-        'sync_queue': sync_queue,
+        'system_overview': system_overview.result(),
+        'device_performance': device_performance.result(),
+        'pricing_performance': pricing_performance.result(),
+        'health_alerts': health_alerts.result(),
+        'sync_queue': sync_queue.result(),
         'timestamp': datetime.now().isoformat()
     }
 
 @frappe.whitelist()
+@redis_cache("pos:real_time_metrics", ttl=10)
 def get_real_time_metrics():
     """Get real-time metrics for live monitoring"""
     
@@ -51,7 +94,7 @@ def get_real_time_metrics():
             AVG(CASE WHEN status = 'Success' THEN TIMESTAMPDIFF(SECOND, creation, completion_time) ELSE NULL END) as avg_response_time
         FROM `tabPOS Sync Log`
         WHERE creation >= %s
-    """, start_of_hour.strftime('%Y-%m-%d %H:%M:%S'), as_dict=True)[0]
+    """, (start_of_hour,), as_dict=True)[0]
     
     # Active devices count
     active_devices = frappe.db.count('POS Device', {'status': 'Active'})
@@ -71,37 +114,66 @@ def get_real_time_metrics():
         'timestamp': now.isoformat()
     }
 
-@frappe.whitelist()
-def get_system_statistics():
-    """Get detailed system statistics"""
-    
-    # Daily statistics for last 30 days
-    daily_stats = frappe.db.sql("""
-        SELECT 
+def _get_today_sync_stats():
+    """Aggregate today's live log rows, which the nightly rollup has not
+    covered yet"""
+    return frappe.db.sql("""
+        SELECT
             DATE(creation) as sync_date,
             COUNT(*) as total_syncs,
             SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) as successful_syncs,
             SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) as failed_syncs,
             AVG(CASE WHEN status = 'Success' THEN TIMESTAMPDIFF(SECOND, creation, completion_time) ELSE NULL END) as avg_response_time
         FROM `tabPOS Sync Log`
-        WHERE creation >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-        GROUP BY DATE(creation)
+        WHERE DATE(creation) = CURDATE()
+    """, as_dict=True)[0]
+
+
+@frappe.whitelist()
+@redis_cache("pos:system_statistics", ttl=300)
+def get_system_statistics():
+    """Get detailed system statistics"""
+    
+    # Daily statistics for last 30 days: read the precomputed rollups and
+    # only aggregate today's rows from the live log
+    daily_stats = frappe.db.sql("""
+        SELECT
+            sync_date,
+            SUM(total) as total_syncs,
+            SUM(success) as successful_syncs,
+            SUM(failed) as failed_syncs,
+            SUM(avg_response_time * success) / NULLIF(SUM(success), 0) as avg_response_time
+        FROM `tabPOS Sync Daily Rollup`
+        WHERE sync_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+        GROUP BY sync_date
         ORDER BY sync_date DESC
     """, as_dict=True)
+
+    today_stats = _get_today_sync_stats()
+    if today_stats.total_syncs:
+        daily_stats.insert(0, today_stats)
     
-    # Device uptime statistics
+    # Device uptime statistics; aggregate the log in a derived table first
+    # so the join sees one row per device instead of fanning out per log
     device_uptime = frappe.db.sql("""
-        SELECT 
+        SELECT
             pd.device_name,
             pd.status,
-            COUNT(sl.name) as total_syncs_30_days,
-            SUM(CASE WHEN sl.status = 'Success' THEN 1 ELSE 0 END) as successful_syncs,
-            (SUM(CASE WHEN sl.status = 'Success' THEN 1 ELSE 0 END) * 100.0 / COUNT(sl.name)) as uptime_percentage,
-            MAX(sl.creation) as last_activity
+            IFNULL(s.total, 0) as total_syncs_30_days,
+            IFNULL(s.success, 0) as successful_syncs,
+            (IFNULL(s.success, 0) * 100.0 / NULLIF(s.total, 0)) as uptime_percentage,
+            s.last_activity
         FROM `tabPOS Device` pd
-        LEFT JOIN `tabPOS Sync Log` sl ON sl.device_name = pd.name 
-            AND sl.creation >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-        GROUP BY pd.name, pd.device_name, pd.status
+        LEFT JOIN (
+            SELECT
+                device_name,
+                COUNT(*) as total,
+                SUM(status = 'Success') as success,
+                MAX(creation) as last_activity
+            FROM `tabPOS Sync Log`
+            WHERE creation >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+            GROUP BY device_name
+        ) s ON s.device_name = pd.name
         ORDER BY uptime_percentage DESC
     """, as_dict=True)
     
@@ -140,20 +212,26 @@ def get_alert_history():
         limit=50
     )
     
-    # Get devices with issues
+    # Get devices with issues; the derived table aggregates failures per
+    # device before the join, which also replaces the HAVING filter
     problematic_devices = frappe.db.sql("""
-        SELECT 
+        SELECT
             pd.device_name,
             pd.status,
-            COUNT(sl.name) as failure_count_7_days,
-            MAX(sl.creation) as last_failure
+            s.failure_count_7_days,
+            s.last_failure
         FROM `tabPOS Device` pd
-        LEFT JOIN `tabPOS Sync Log` sl ON sl.device_name = pd.name 
-            AND sl.status = 'Failed'
-            AND sl.creation >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-        GROUP BY pd.name, pd.device_name, pd.status
-        HAVING failure_count_7_days > 0
-        ORDER BY failure_count_7_days DESC
+        JOIN (
+            SELECT
+                device_name,
+                COUNT(*) as failure_count_7_days,
+                MAX(creation) as last_failure
+            FROM `tabPOS Sync Log`
+            WHERE status = 'Failed'
+                AND creation >= DATE_SUB(NOW(), INTERVAL 7 DAY)
+            GROUP BY device_name
+        ) s ON s.device_name = pd.name
+        ORDER BY s.failure_count_7_days DESC
     """, as_dict=True)
     
     return {
@@ -166,19 +244,38 @@ def get_alert_history():
 def get_performance_trends():
     """Get performance trend analysis"""
     
-    # Weekly performance trends
+    # Weekly performance trends from the daily rollups; today's live rows
+    # are folded into the current week below
     weekly_trends = frappe.db.sql("""
-        SELECT 
-            YEARWEEK(creation, 1) as week_year,
-            WEEK(creation, 1) as week_number,
-            COUNT(*) as total_operations,
-            SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) as successful_operations,
-            AVG(CASE WHEN status = 'Success' THEN TIMESTAMPDIFF(SECOND, creation, completion_time) ELSE NULL END) as avg_response_time
-        FROM `tabPOS Sync Log`
-        WHERE creation >= DATE_SUB(NOW(), INTERVAL 12 WEEK)
-        GROUP BY YEARWEEK(creation, 1), WEEK(creation, 1)
+        SELECT
+            YEARWEEK(sync_date, 1) as week_year,
+            WEEK(sync_date, 1) as week_number,
+            SUM(total) as total_operations,
+            SUM(success) as successful_operations,
+            SUM(avg_response_time * success) / NULLIF(SUM(success), 0) as avg_response_time
+        FROM `tabPOS Sync Daily Rollup`
+        WHERE sync_date >= DATE_SUB(CURDATE(), INTERVAL 12 WEEK)
+        GROUP BY YEARWEEK(sync_date, 1), WEEK(sync_date, 1)
         ORDER BY week_year DESC
     """, as_dict=True)
+
+    today_stats = _get_today_sync_stats()
+    if today_stats.total_syncs:
+        current_week = datetime.now().isocalendar()
+        current_week_year = current_week[0] * 100 + current_week[1]
+        current_row = next(
+            (row for row in weekly_trends if row.week_year == current_week_year), None)
+        if current_row:
+            current_row.total_operations += today_stats.total_syncs
+            current_row.successful_operations += today_stats.successful_syncs
+        else:
+            weekly_trends.insert(0, frappe._dict(
+                week_year=current_week_year,
+                week_number=current_week[1],
+                total_operations=today_stats.total_syncs,
+                successful_operations=today_stats.successful_syncs,
+                avg_response_time=today_stats.avg_response_time
+            ))
     
     # Device performance comparison
     device_comparison = frappe.db.sql("""
@@ -4,31 +4,42 @@
 import frappe
 import secrets
 import string
+from datetime import datetime
 from frappe.model.document import Document
 from frappe import _
 
+from erpnext_pos_integration.utils.security import safe_eq
+
+HEARTBEAT_CACHE = "pos_device_hb"
+
+_ID_ALPHABET = string.ascii_uppercase + string.digits
+
 
 class POSDevice(Document):
     def before_insert(self):
-        """Auto-generate device ID if not provided"""
+        """Auto-generate device ID and credentials if not provided
+
+        Credentials are generated here so registered devices are written
+        with their keys in the initial INSERT; the previous after_insert
+        save cost a second full-row UPDATE and left a window where the
+        row existed without credentials.
+        """
         if not self.device_id:
             self.device_id = self.generate_device_id()
-    
+        if self.is_registered and not self.api_key:
+            self.generate_api_credentials()
+
     def validate(self):
         """Validate device data before saving"""
         self.validate_registration_code()
         self.validate_branch_company_link()
-    
-    def after_insert(self):
-        """Generate API credentials after device creation"""
-        if self.is_registered and not self.api_key:
-            self.generate_api_credentials()
-            self.save()
-    
+
     def generate_device_id(self):
         """Generate unique device ID"""
-        timestamp = frappe.utils.now().strftime("%Y%m%d%H%M%S")
-        random_suffix = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(4))
+        # frappe.utils.now() returns a string, so calling .strftime on it
+        # raised AttributeError; format the datetime directly
+        timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        random_suffix = ''.join(secrets.choice(_ID_ALPHABET) for _ in range(4))
         return f"POS_{timestamp}_{random_suffix}"
     
     def generate_api_credentials(self):
@@ -57,12 +68,23 @@ class POSDevice(Document):
                 frappe.throw(_("Branch must belong to the selected company"))
     
     def update_sync_status(self, status, last_sync=None):
-        """Update device sync status"""
+        """Update device sync status
+
+        Heartbeat-only pings (status unchanged, no sync timestamp) are
+        staged in Redis and written to MariaDB in bulk by the scheduled
+        flush, so frequent pings do not each cost a row update. Real
+        status or sync transitions go through the targeted column
+        update below rather than a full save.
+        """
+        if status == self.sync_status and not last_sync:
+            frappe.cache().hset(HEARTBEAT_CACHE, self.name, frappe.utils.now())
+            return
+
         self.sync_status = status
         if last_sync:
             self.last_sync_at = last_sync
         self.last_heartbeat = frappe.utils.now()
-        self.save(ignore_permissions=True)
+        set_sync_status(self.name, status, last_sync)
     
     def mark_online(self):
         """Mark device as online"""
@@ -166,18 +188,65 @@ def update_device_heartbeat(device_id, api_key):
         # Validate device credentials
         if not validate_device_credentials(device_id, api_key):
             return {"status": "error", "message": "Invalid device credentials"}
-        
+
+        # Throttle: skip the DB write if this device pinged in the last 10s
+        throttle_key = f"pos:heartbeat:{device_id}"
+        if frappe.cache().get_value(throttle_key):
+            return {"status": "success", "message": "Heartbeat updated"}
+
         device = frappe.get_doc("POS Device", {"device_id": device_id})
         device.mark_online()
-        frappe.db.commit()
-        
+        frappe.cache().set_value(throttle_key, 1, expires_in_sec=10)
+
+        # No explicit commit; the request-end autocommit covers the write
+
         return {"status": "success", "message": "Heartbeat updated"}
-        
+
     except Exception as e:
         frappe.db.rollback()
         return {"status": "error", "message": str(e)}
 
 
+def set_sync_status(name, status, last_sync=None):
+    """Write a device's sync status as a targeted column update
+
+    A full doc.save() reloads the row, re-runs every validate hook
+    (including the Branch lookup) and rewrites all columns just to flip
+    the status; setting the changed columns directly touches only the
+    Device table with one narrow UPDATE.
+    """
+    values = {"sync_status": status, "last_heartbeat": frappe.utils.now()}
+    if last_sync:
+        values["last_sync_at"] = last_sync
+
+    frappe.db.set_value("POS Device", name, values, update_modified=False)
+
+
+def flush_device_heartbeats():
+    """Write the Redis-staged heartbeats to MariaDB in one batch
+
+    Runs every 5 minutes; turns O(pings) row updates into one
+    executemany per window.
+    """
+    staged = frappe.cache().hgetall(HEARTBEAT_CACHE) or {}
+    if not staged:
+        return
+
+    frappe.cache().delete_value(HEARTBEAT_CACHE)
+
+    values = [
+        (timestamp, frappe.safe_decode(device_name))
+        for device_name, timestamp in staged.items()
+    ]
+
+    frappe.db._cursor.executemany("""
+        UPDATE `tabPOS Device`
+        SET last_heartbeat = %s
+        WHERE name = %s
+    """, values)
+    frappe.db.commit()
+
+
 def validate_registration_code_format(code):
     """Validate registration code format"""
     # Basic validation - in production, this would check against a database
@@ -185,12 +254,34 @@ def validate_registration_code_format(code):
 
 
 def validate_device_credentials(device_id, api_key):
-    """Validate device credentials"""
-    device = frappe.db.get_value("POS Device", 
-        {"device_id": device_id, "api_key": api_key, "is_registered": 1}, 
-        ["name"], as_dict=True)
-    
-    return bool(device)
+    """Validate device credentials
+
+    The stored key is compared in Python through safe_eq rather than in
+    the SQL WHERE clause, closing the byte-by-byte timing side channel
+    and letting the lookup use the device_id index alone.
+    """
+    row = frappe.db.get_value("POS Device",
+        {"device_id": device_id, "is_registered": 1},
+        ["name", "api_key"], as_dict=True)
+
+    return bool(row and row.api_key and safe_eq(row.api_key, api_key))
+
+
+def get_device_by_credentials(device_id, api_key):
+    """Get device document if credentials are valid, else None
+
+    Combines credential validation and device lookup into a single
+    fetch so API endpoints do not load the device twice per request.
+    The key comparison runs in constant time, as above.
+    """
+    row = frappe.db.get_value("POS Device",
+        {"device_id": device_id, "is_registered": 1},
+        ["name", "api_key"], as_dict=True)
+
+    if not row or not row.api_key or not safe_eq(row.api_key, api_key):
+        return None
+
+    return frappe.get_doc("POS Device", row.name)
 
 
 def get_active_devices(branch=None):
@@ -208,13 +299,24 @@ def get_active_devices(branch=None):
 
 
 def get_device_statistics():
-    """Get overall device statistics"""
-    stats = {
-        "total_devices": frappe.db.count("POS Device", {"is_registered": 1}),
-        "online_devices": frappe.db.count("POS Device", {"sync_status": "Online", "is_registered": 1}),
-        "offline_devices": frappe.db.count("POS Device", {"sync_status": "Offline", "is_registered": 1}),
-        "error_devices": frappe.db.count("POS Device", {"sync_status": "Error", "is_registered": 1}),
-        "syncing_devices": frappe.db.count("POS Device", {"sync_status": "Syncing", "is_registered": 1})
-    }
-    
-    return stats
\ No newline at end of file
+    """Get overall device statistics
+
+    One GROUP BY over sync_status replaces five separate COUNT queries
+    against the same table.
+    """
+    rows = frappe.db.sql("""
+        SELECT sync_status, COUNT(*) as count
+        FROM `tabPOS Device`
+        WHERE is_registered = 1
+        GROUP BY sync_status
+    """, as_dict=True)
+
+    by_status = {row.sync_status: row.count for row in rows}
+
+    return {
+        "total_devices": sum(by_status.values()),
+        "online_devices": by_status.get("Online", 0),
+        "offline_devices": by_status.get("Offline", 0),
+        "error_devices": by_status.get("Error", 0),
+        "syncing_devices": by_status.get("Syncing", 0)
+    }
\ No newline at end of file
@@ -4,9 +4,92 @@
 import frappe
 from frappe.model.document import Document
 from frappe import _
+from collections import defaultdict
 from datetime import datetime, time
 import json
 
+# Columns needed by is_applicable and calculate_price; fetched explicitly
+# instead of "*" to keep the rows narrow
+RULE_COLUMNS = [
+    "name", "rule_name", "pricing_type", "priority_level", "erpnext_priority",
+    "is_active", "valid_from", "valid_upto", "from_time", "to_time",
+    "item_code", "item_group", "brand", "customer", "customer_group",
+    "territory", "base_price", "discount_percentage", "discount_amount",
+    "min_quantity", "max_quantity", "min_spend_amount",
+    "bxgy_buy_qty", "bxgy_get_qty"
+]
+
+_RULE_CACHE_KEY = "pos_pricing_rules:v1"
+
+# Built once at import instead of per save
+_PRIORITY_MAP = {
+    "1": 20,  # Base Item Price
+    "2": 19,  # Branch Price Override
+    "3": 18,  # Member/Customer Price
+    "4": 17,  # Time-based Promotion
+    "5": 16,  # Quantity Break Discount
+    "6": 15,  # Spend X Discount
+    "7": 14,  # Buy X Get Y (BXGY)
+    "8": 13   # Manual Override
+}
+
+
+def clear_rule_cache():
+    """Drop the cached active-rule dataset"""
+    frappe.cache().delete_value(_RULE_CACHE_KEY)
+
+
+_HMS_CACHE = {}
+
+
+def _parse_hms(value):
+    """Parse an HH:MM:SS string to a time object, memoized on the string
+
+    The same handful of rule time strings get parsed on every price
+    check; caching the parse result skips the repeated strptime work.
+    """
+    if not value:
+        return None
+    if value not in _HMS_CACHE:
+        _HMS_CACHE[value] = datetime.strptime(value, "%H:%M:%S").time()
+    return _HMS_CACHE[value]
+
+
+def _item_info(item_code):
+    """Get item_group and brand for an item in one memoized lookup
+
+    Request-scoped cache on frappe.local: many rules checking the same
+    item cost one Item query in total instead of two per rule.
+    """
+    if not item_code:
+        return frappe._dict()
+
+    cache = getattr(frappe.local, "pos_item_cache", None)
+    if cache is None:
+        cache = frappe.local.pos_item_cache = {}
+
+    if item_code not in cache:
+        cache[item_code] = frappe.get_value("Item", item_code,
+            ["item_group", "brand"], as_dict=True) or frappe._dict()
+
+    return cache[item_code]
+
+
+def _customer_info(customer):
+    """Get customer_group and territory in one memoized lookup"""
+    if not customer:
+        return frappe._dict()
+
+    cache = getattr(frappe.local, "pos_customer_cache", None)
+    if cache is None:
+        cache = frappe.local.pos_customer_cache = {}
+
+    if customer not in cache:
+        cache[customer] = frappe.get_value("Customer", customer,
+            ["customer_group", "territory"], as_dict=True) or frappe._dict()
+
+    return cache[customer]
+
 class POSPricingRule(Document):
     def before_save(self):
         """Validate and set defaults before saving"""
@@ -23,21 +106,10 @@ class POSPricingRule(Document):
         
     def validate_priority_mapping(self):
         """Validate priority level and map to ERPNext priorities"""
-        priority_mapping = {
-            "1": 20,  # Base Item Price
-            "2": 19,  # Branch Price Override  
-            "3": 18,  # Member/Customer Price
-            "4": 17,  # Time-based Promotion
-            "5": 16,  # Quantity Break Discount
-            "6": 15,  # Spend X Discount
-            "7": 14,  # Buy X Get Y (BXGY)
-            "8": 13   # Manual Override
-        }
-        
-        if self.priority_level not in priority_mapping:
+        if self.priority_level not in _PRIORITY_MAP:
             frappe.throw(_("Invalid priority level. Must be between 1-8"))
-            
-        self.erpnext_priority = priority_mapping[self.priority_level]
+
+        self.erpnext_priority = _PRIORITY_MAP[self.priority_level]
         
     def validate_time_range(self):
         """Validate time-based pricing conditions"""
@@ -68,10 +140,14 @@ class POSPricingRule(Document):
                 
     def validate_branch_conditions(self):
         """Validate branch conditions"""
-        if self.branch_conditions:
-            branch_ids = [item.branch_id for item in self.branch_conditions if item.branch_id]
-            if len(branch_ids) != len(set(branch_ids)):
+        # Single pass with early exit instead of building two containers
+        seen = set()
+        for item in (self.branch_conditions or []):
+            if not item.branch_id:
+                continue
+            if item.branch_id in seen:
                 frappe.throw(_("Duplicate branch IDs found in branch conditions"))
+            seen.add(item.branch_id)
                 
     def set_creation_info(self):
         """Set creation and modification info"""
@@ -82,6 +158,14 @@ class POSPricingRule(Document):
         self.modified = datetime.now()
         self.modified_by = frappe.session.user
         
+    def on_update(self):
+        """Invalidate the cached rule set when a rule changes"""
+        clear_rule_cache()
+
+    def on_trash(self):
+        """Invalidate the cached rule set when a rule is deleted"""
+        clear_rule_cache()
+
     def is_applicable(self, transaction_context):
         """
         Check if pricing rule is applicable for given transaction context
@@ -137,9 +221,9 @@ class POSPricingRule(Document):
         # Check time range
         if self.from_time and self.to_time:
             current_time = now.time()
-            from_time = datetime.strptime(self.from_time, "%H:%M:%S").time()
-            to_time = datetime.strptime(self.to_time, "%H:%M:%S").time()
-            
+            from_time = _parse_hms(self.from_time)
+            to_time = _parse_hms(self.to_time)
+
             if from_time <= to_time:
                 # Same day time range
                 if not (from_time <= current_time <= to_time):
@@ -167,19 +251,18 @@ class POSPricingRule(Document):
         # Check specific item
         if self.item_code and self.item_code != item_code:
             return False
-            
-        # Check item group
-        if self.item_group:
-            item_group = frappe.get_value("Item", item_code, "item_group") if item_code else None
-            if item_group != self.item_group:
+
+        # Check item group and brand from one cached lookup; without an
+        # item there is nothing to match, so skip the lookup entirely
+        if self.item_group or self.brand:
+            if not item_code:
                 return False
-                
-        # Check brand
-        if self.brand:
-            item_brand = frappe.get_value("Item", item_code, "brand") if item_code else None
-            if item_brand != self.brand:
+            info = _item_info(item_code)
+            if self.item_group and info.get("item_group") != self.item_group:
                 return False
-                
+            if self.brand and info.get("brand") != self.brand:
+                return False
+
         return True
         
     def _is_customer_valid(self, customer):
@@ -187,19 +270,18 @@ class POSPricingRule(Document):
         # Check specific customer
         if self.customer and self.customer != customer:
             return False
-            
-        # Check customer group
-        if self.customer_group:
-            customer_group = frappe.get_value("Customer", customer, "customer_group") if customer else None
-            if customer_group != self.customer_group:
+
+        # Check customer group and territory from one cached lookup;
+        # without a customer there is nothing to match
+        if self.customer_group or self.territory:
+            if not customer:
                 return False
-                
-        # Check territory
-        if self.territory:
-            customer_territory = frappe.get_value("Customer", customer, "territory") if customer else None
-            if customer_territory != self.territory:
+            info = _customer_info(customer)
+            if self.customer_group and info.get("customer_group") != self.customer_group:
                 return False
-                
+            if self.territory and info.get("territory") != self.territory:
+                return False
+
         return True
         
     def _is_quantity_valid(self, quantity):
@@ -228,97 +310,271 @@ class POSPricingRule(Document):
             'discount_percentage': 0,
             'rule_applied': self.name
         }
-        
-        if self.pricing_type == "Base Price":
-            result['final_price'] = self.base_price or base_price
-            
-        elif self.pricing_type == "Branch Override":
-            result['final_price'] = self.base_price or base_price
-            
-        elif self.pricing_type == "Customer Price":
-            result['final_price'] = self.base_price or base_price
-            
-        elif self.pricing_type == "Time-based":
-            if self.discount_percentage:
-                discount = base_price * (self.discount_percentage / 100)
-                result['final_price'] = base_price - discount
-                result['discount_amount'] = discount
-                result['discount_percentage'] = self.discount_percentage
-            elif self.discount_amount:
-                result['final_price'] = max(0, base_price - self.discount_amount)
-                result['discount_amount'] = self.discount_amount
-                
-        elif self.pricing_type == "Quantity Break":
-            if self.discount_percentage:
-                discount = base_price * (self.discount_percentage / 100)
-                result['final_price'] = base_price - discount
-                result['discount_amount'] = discount
-                result['discount_percentage'] = self.discount_percentage
-            elif self.discount_amount:
-                result['final_price'] = max(0, base_price - self.discount_amount)
-                result['discount_amount'] = self.discount_amount
-                
-        elif self.pricing_type == "Spend Discount":
-            if self.discount_percentage:
-                discount = base_price * (self.discount_percentage / 100)
-                result['final_price'] = base_price - discount
-                result['discount_amount'] = discount
-                result['discount_percentage'] = self.discount_percentage
-            elif self.discount_amount:
-                result['final_price'] = max(0, base_price - self.discount_amount)
-                result['discount_amount'] = self.discount_amount
-                
-        elif self.pricing_type == "BXGY":
-            # BXGY logic - calculate effective price for promotional items
-            if self.bxgy_buy_qty > 0:
-                free_items = quantity // (self.bxgy_buy_qty + self.bxgy_get_qty) * self.bxgy_get_qty
-                if free_items > 0:
-                    effective_quantity = quantity - free_items
-                    result['final_price'] = (base_price * effective_quantity) / quantity
-                    result['free_items'] = free_items
-                    
-        elif self.pricing_type == "Manual Override":
-            if self.base_price:
-                result['final_price'] = self.base_price
-            elif self.discount_percentage:
-                discount = base_price * (self.discount_percentage / 100)
-                result['final_price'] = base_price - discount
-                result['discount_amount'] = discount
-                result['discount_percentage'] = self.discount_percentage
-            elif self.discount_amount:
-                result['final_price'] = max(0, base_price - self.discount_amount)
-                result['discount_amount'] = self.discount_amount
-                
+
+        # One dict dispatch replaces the eight-way elif chain; the three
+        # discount types share a single implementation
+        handler = _PRICE_FUNCS.get(self.pricing_type)
+        if handler:
+            handler(self, result, base_price, quantity)
+
         return result
 
-@frappe.whitelist()
-def get_applicable_pricing_rules(item_code, branch_id=None, customer=None, quantity=1, total_amount=0):
-    """
-    Get all applicable pricing rules for given context
+
+def _price_base(rule, result, base_price, quantity):
+    """Fixed-price types: the rule price replaces the base price"""
+    result['final_price'] = rule.base_price or base_price
+
+
+def _price_discount(rule, result, base_price, quantity):
+    """Percentage or amount discount off the base price"""
+    if rule.discount_percentage:
+        discount = base_price * (rule.discount_percentage / 100)
+        result['final_price'] = base_price - discount
+        result['discount_amount'] = discount
+        result['discount_percentage'] = rule.discount_percentage
+    elif rule.discount_amount:
+        result['final_price'] = max(0, base_price - rule.discount_amount)
+        result['discount_amount'] = rule.discount_amount
+
+
+def _price_bxgy(rule, result, base_price, quantity):
+    """BXGY logic - calculate effective price for promotional items"""
+    if rule.bxgy_buy_qty > 0:
+        free_items = quantity // (rule.bxgy_buy_qty + rule.bxgy_get_qty) * rule.bxgy_get_qty
+        if free_items > 0:
+            effective_quantity = quantity - free_items
+            result['final_price'] = (base_price * effective_quantity) / quantity
+            result['free_items'] = free_items
+
+
+def _price_manual(rule, result, base_price, quantity):
+    """Manual Override: an explicit price wins, else apply the discount"""
+    if rule.base_price:
+        result['final_price'] = rule.base_price
+    else:
+        _price_discount(rule, result, base_price, quantity)
+
+
+_PRICE_FUNCS = {
+    "Base Price": _price_base,
+    "Branch Override": _price_base,
+    "Customer Price": _price_base,
+    "Time-based": _price_discount,
+    "Quantity Break": _price_discount,
+    "Spend Discount": _price_discount,
+    "BXGY": _price_bxgy,
+    "Manual Override": _price_manual
+}
+
+
+def _get_active_rule_data():
+    """Get all active rules plus child rows as plain dicts, Redis-cached
+
+    Rules change rarely but are read on every POS line, so the dataset is
+    cached as picklable dicts (not Documents) for up to 300s and dropped
+    eagerly from on_update/on_trash.
     """
-    # Get all active pricing rules
-    pricing_rules = frappe.get_all(
+    data = frappe.cache().get_value(_RULE_CACHE_KEY)
+    if data is not None:
+        return data
+
+    parents = frappe.get_all(
         "POS Pricing Rule",
         filters={"is_active": 1},
-        fields=["*"],
+        fields=RULE_COLUMNS,
         order_by="erpnext_priority desc"
     )
-    
-    applicable_rules = []
-    transaction_context = {
+
+    names = [parent.name for parent in parents]
+    branch_rows = frappe.get_all("POS Pricing Rule Branch",
+        filters={"parent": ("in", names)},
+        fields=["parent", "branch_id"]) if names else []
+    day_rows = frappe.get_all("POS Pricing Rule Days",
+        filters={"parent": ("in", names)},
+        fields=["parent", "day_of_week"]) if names else []
+
+    # 7-bit weekday mask per rule (bit 0 = Monday); None means the rule
+    # has no day rows and therefore no day restriction
+    day_mask_by_parent = {}
+    for row in day_rows:
+        mask = day_mask_by_parent.get(row.parent, 0)
+        if row.day_of_week and row.day_of_week.isdigit():
+            mask |= 1 << (int(row.day_of_week) - 1)
+        day_mask_by_parent[row.parent] = mask
+
+    for parent in parents:
+        # Compiled once per cache rebuild instead of per applicability check
+        parent._from_time = _parse_hms(parent.from_time)
+        parent._to_time = _parse_hms(parent.to_time)
+        parent._day_mask = day_mask_by_parent.get(parent.name)
+
+    data = {"parents": parents, "branches": branch_rows, "days": day_rows}
+    frappe.cache().set_value(_RULE_CACHE_KEY, data, expires_in_sec=300)
+    return data
+
+
+def _load_rule_docs(names):
+    """Build in-memory rule documents for the given names
+
+    frappe.get_doc per rule fetches each child table lazily — an N+1
+    pattern for branch_conditions and days_of_week. The cached dataset
+    already holds parents and children in bulk; group the children by
+    parent and build in-memory documents, so is_applicable and
+    calculate_price work unchanged without any per-rule queries.
+    """
+    if not names:
+        return []
+
+    wanted = set(names)
+    data = _get_active_rule_data()
+
+    branches_by_parent = defaultdict(list)
+    for row in data["branches"]:
+        if row.parent in wanted:
+            branches_by_parent[row.parent].append({"branch_id": row.branch_id})
+
+    days_by_parent = defaultdict(list)
+    for row in data["days"]:
+        if row.parent in wanted:
+            days_by_parent[row.parent].append({"day_of_week": row.day_of_week})
+
+    rule_docs = []
+    for parent in data["parents"]:
+        if parent.name not in wanted:
+            continue
+        rule = dict(parent)
+        rule.pop("_from_time", None)
+        rule.pop("_to_time", None)
+        rule.pop("_day_mask", None)
+        rule.update({
+            "doctype": "POS Pricing Rule",
+            "branch_conditions": branches_by_parent.get(parent.name, []),
+            "days_of_week": days_by_parent.get(parent.name, [])
+        })
+        rule_docs.append(frappe.get_doc(rule))
+
+    return rule_docs
+
+
+def _matches(rule, branch_ids, ctx, now, weekday_bit, now_time):
+    """Applicability check inlined over a plain cached rule row
+
+    Mirrors POSPricingRule.is_applicable but runs on the raw dicts from
+    _get_active_rule_data: no Document is instantiated per candidate and
+    no DB call happens inside the loop, because the item and customer
+    attributes are pre-resolved once into ctx.
+    """
+    if not rule.is_active:
+        return False
+
+    # Date range
+    if rule.valid_from and now < rule.valid_from:
+        return False
+    if rule.valid_upto and now > rule.valid_upto:
+        return False
+
+    # Day of week against the precomputed weekday mask
+    if rule._day_mask is not None and not rule._day_mask & weekday_bit:
+        return False
+
+    # Time range, precompiled to time objects at batch-load
+    if rule._from_time and rule._to_time:
+        if rule._from_time <= rule._to_time:
+            if not (rule._from_time <= now_time <= rule._to_time):
+                return False
+        else:
+            # Overnight time range
+            if not (now_time >= rule._from_time or now_time <= rule._to_time):
+                return False
+
+    # Branch
+    if branch_ids and ctx['branch_id'] not in branch_ids:
+        return False
+
+    # Item
+    if rule.item_code and rule.item_code != ctx['item_code']:
+        return False
+    if rule.item_group and rule.item_group != ctx['item_group']:
+        return False
+    if rule.brand and rule.brand != ctx['brand']:
+        return False
+
+    # Customer
+    if rule.customer and rule.customer != ctx['customer']:
+        return False
+    if rule.customer_group and rule.customer_group != ctx['customer_group']:
+        return False
+    if rule.territory and rule.territory != ctx['territory']:
+        return False
+
+    # Quantity and spend
+    if rule.min_quantity and ctx['quantity'] < rule.min_quantity:
+        return False
+    if rule.max_quantity and ctx['quantity'] > rule.max_quantity:
+        return False
+    if rule.min_spend_amount and ctx['total_amount'] < rule.min_spend_amount:
+        return False
+
+    return True
+
+
+@frappe.whitelist()
+def get_applicable_pricing_rules(item_code, branch_id=None, customer=None, quantity=1, total_amount=0):
+    """
+    Get all applicable pricing rules for given context
+    """
+    from erpnext_pos_integration.utils.pricing_engine import get_candidate_rule_names
+
+    item_info = _item_info(item_code)
+    customer_info = _customer_info(customer)
+
+    # Narrow the scan to trie candidates instead of loading every rule
+    candidate_names = set(get_candidate_rule_names(
+        item_code=item_code,
+        item_group=item_info.get("item_group"),
+        customer_group=customer_info.get("customer_group")
+    ))
+    if not candidate_names:
+        return []
+
+    # All item/customer attributes resolved up front so _matches stays a
+    # pure function over the cached rows
+    ctx = {
         'item_code': item_code,
-        'branch_id': branch_id,
+        'item_group': item_info.get('item_group'),
+        'brand': item_info.get('brand'),
         'customer': customer,
+        'customer_group': customer_info.get('customer_group'),
+        'territory': customer_info.get('territory'),
+        'branch_id': branch_id,
         'quantity': quantity,
         'total_amount': total_amount
     }
-    
-    for rule in pricing_rules:
-        rule_doc = frappe.get_doc("POS Pricing Rule", rule.name)
-        if rule_doc.is_applicable(transaction_context):
-            applicable_rules.append(rule_doc)
-            
-    return applicable_rules
+
+    data = _get_active_rule_data()
+
+    branch_ids_by_parent = defaultdict(list)
+    for row in data["branches"]:
+        if row.parent in candidate_names and row.branch_id:
+            branch_ids_by_parent[row.parent].append(row.branch_id)
+
+    # Clock values derived once instead of per candidate rule
+    now = datetime.now()
+    weekday_bit = 1 << now.weekday()
+    now_time = now.time()
+
+    matching_names = [
+        rule.name for rule in data["parents"]
+        if rule.name in candidate_names and _matches(
+            rule,
+            branch_ids_by_parent.get(rule.name),
+            ctx, now, weekday_bit, now_time)
+    ]
+
+    # Documents are only built for the rules that actually matched, so
+    # calculate_price keeps working on the result; data["parents"] is
+    # ordered by erpnext_priority, so the highest priority rule stays first
+    return _load_rule_docs(matching_names)
 
 @frappe.whitelist()
 def calculate_final_price(item_code, base_price, branch_id=None, customer=None, quantity=1, total_amount=0):
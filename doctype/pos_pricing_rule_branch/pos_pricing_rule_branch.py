@@ -16,13 +16,19 @@ class POSPricingRuleBranch(Document):
         if not self.branch_id:
             frappe.throw(_("Branch ID is required"))
             
-        # Check if branch ID already exists in this pricing rule
-        parent_doc = frappe.get_doc("POS Pricing Rule", self.parent)
-        if parent_doc:
-            existing_branches = [item.branch_id for item in parent_doc.branch_conditions 
-                               if item.name != self.name and item.branch_id == self.branch_id]
-            if existing_branches:
-                frappe.throw(_("Branch ID '{0}' already exists in this pricing rule").format(self.branch_id))
+        # Unsaved child rows have no parent to check against yet; the
+        # parent rule validates duplicates across its in-memory rows
+        if not self.parent:
+            return
+
+        # One indexed SELECT for a duplicate sibling instead of hydrating
+        # the whole parent rule with all its children
+        duplicate = frappe.db.get_all("POS Pricing Rule Branch",
+            filters={"parent": self.parent, "branch_id": self.branch_id,
+                "name": ("!=", self.name or "")},
+            limit=1)
+        if duplicate:
+            frappe.throw(_("Branch ID '{0}' already exists in this pricing rule").format(self.branch_id))
                 
     def set_branch_name(self):
         """Set branch name based on branch ID"""
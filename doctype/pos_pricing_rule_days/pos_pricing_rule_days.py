@@ -5,6 +5,17 @@ import frappe
 from frappe.model.document import Document
 from frappe import _
 
+# Built once at import instead of per child-row save
+_DAY_NAMES = {
+    "1": "Monday",
+    "2": "Tuesday",
+    "3": "Wednesday",
+    "4": "Thursday",
+    "5": "Friday",
+    "6": "Saturday",
+    "7": "Sunday"
+}
+
 class POSPricingRuleDays(Document):
     def validate(self):
         """Validate days of week data"""
@@ -16,14 +27,20 @@ class POSPricingRuleDays(Document):
         if not self.day_of_week:
             frappe.throw(_("Day of Week is required"))
             
-        # Check if day already exists in this pricing rule
-        parent_doc = frappe.get_doc("POS Pricing Rule", self.parent)
-        if parent_doc:
-            existing_days = [item.day_of_week for item in parent_doc.days_of_week 
-                           if item.name != self.name and item.day_of_week == self.day_of_week]
-            if existing_days:
-                day_name = self.get_day_name_by_number(self.day_of_week)
-                frappe.throw(_("Day '{0}' already exists in this pricing rule").format(day_name))
+        # Unsaved child rows have no parent to check against yet; the
+        # parent rule validates duplicates across its in-memory rows
+        if not self.parent:
+            return
+
+        # One indexed lookup for a duplicate sibling instead of hydrating
+        # the whole parent rule with all its children
+        duplicate = frappe.db.get_all("POS Pricing Rule Days",
+            filters={"parent": self.parent, "day_of_week": self.day_of_week,
+                "name": ("!=", self.name or "")},
+            limit=1)
+        if duplicate:
+            day_name = self.get_day_name_by_number(self.day_of_week)
+            frappe.throw(_("Day '{0}' already exists in this pricing rule").format(day_name))
                 
     def set_day_name(self):
         """Set day name based on day number"""
@@ -32,16 +49,7 @@ class POSPricingRuleDays(Document):
             
     def get_day_name_by_number(self, day_number):
         """Get day name from day number"""
-        day_names = {
-            "1": "Monday",
-            "2": "Tuesday", 
-            "3": "Wednesday",
-            "4": "Thursday",
-            "5": "Friday",
-            "6": "Saturday",
-            "7": "Sunday"
-        }
-        return day_names.get(day_number, f"Day {day_number}")
+        return _DAY_NAMES.get(day_number, f"Day {day_number}")
         
     def before_save(self):
         """Set defaults before saving"""
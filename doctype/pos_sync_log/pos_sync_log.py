@@ -4,7 +4,51 @@
 import frappe
 from frappe.model.document import Document
 from frappe import _
-from frappe.utils import now, get_datetime
+from frappe.utils import now, get_datetime, now_datetime
+from datetime import timedelta
+
+# Informational messages go to the rotating site log, not the Error Log
+# table, so routine scheduler runs do not cost indexed DB writes
+logger = frappe.logger("pos_integration", allow_site=True, file_count=5)
+
+# Statistics cache TTL per time range; coarser ranges tolerate staler data
+_STATS_TTL = {"24h": 60, "7d": 300, "30d": 900}
+
+# Built once at import; avoids the string-branch plus add_hours/add_days
+# round-trip (each of which reparses now()) on every statistics call
+_RANGES = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30)
+}
+
+
+def _clear_sync_stats_cache():
+    """Drop all cached sync statistics
+
+    Writers call this so dashboards never serve aggregates staler than
+    the last completed sync, regardless of the TTL.
+    """
+    frappe.cache().delete_keys("pos_sync_stats")
+
+
+def _resolve_device(device_id):
+    """Resolve a device_id to its name and device_name in one lookup
+
+    frappe.get_doc hydrates the whole device document just to read
+    .name; this fetches the two columns actually needed with one
+    indexed SELECT and memoizes the row on frappe.local so repeated
+    resolutions inside a request are free.
+    """
+    cache = getattr(frappe.local, "pos_device_cache", None)
+    if cache is None:
+        cache = frappe.local.pos_device_cache = {}
+
+    if device_id not in cache:
+        cache[device_id] = frappe.db.get_value("POS Device",
+            {"device_id": device_id}, ["name", "device_name"], as_dict=True)
+
+    return cache[device_id]
 
 
 class POSSyncLog(Document):
@@ -17,13 +61,30 @@ class POSSyncLog(Document):
         """Validate sync log data"""
         self.validate_timing()
         self.validate_metrics()
-    
+        # Computed here so on_update does not need a second pass (which
+        # ran after the row was already written and never persisted)
+        if self.end_time and not self.duration:
+            self.calculate_duration()
+
+    def _get_dt(self):
+        """Parse start/end time once per save instead of per consumer
+
+        Keyed on the raw field values, so any assignment to start_time
+        or end_time naturally invalidates the cached parse.
+        """
+        key = (self.start_time, self.end_time)
+        if getattr(self, "_dt_cache_key", None) != key:
+            self._start_dt = get_datetime(self.start_time) if self.start_time else None
+            self._end_dt = get_datetime(self.end_time) if self.end_time else None
+            self._dt_cache_key = key
+        return self._start_dt, self._end_dt
+
     def validate_timing(self):
         """Validate timing fields"""
-        if self.start_time and self.end_time:
-            if get_datetime(self.end_time) < get_datetime(self.start_time):
-                frappe.throw(_("End time cannot be before start time"))
-    
+        start_dt, end_dt = self._get_dt()
+        if start_dt and end_dt and end_dt < start_dt:
+            frappe.throw(_("End time cannot be before start time"))
+
     def validate_metrics(self):
         """Validate performance metrics"""
         if self.items_synced < 0:
@@ -33,67 +94,164 @@ class POSSyncLog(Document):
         if self.conflicts_detected < 0:
             frappe.throw(_("Conflicts detected cannot be negative"))
     
-    def on_update(self):
-        """Calculate duration when end time is set"""
-        if self.end_time and not self.duration:
-            self.calculate_duration()
-    
     def calculate_duration(self):
         """Calculate sync duration in seconds"""
-        if self.start_time and self.end_time:
-            start_dt = get_datetime(self.start_time)
-            end_dt = get_datetime(self.end_time)
-            duration_seconds = (end_dt - start_dt).total_seconds()
-            self.duration = int(duration_seconds)
+        start_dt, end_dt = self._get_dt()
+        if start_dt and end_dt:
+            self.duration = int((end_dt - start_dt).total_seconds())
     
     def mark_completed(self, items_synced=0, transactions_synced=0, conflicts_detected=0, sync_data=None):
         """Mark sync operation as completed"""
-        self.sync_status = "Completed"
-        self.end_time = now()
-        self.items_synced = items_synced
-        self.transactions_synced = transactions_synced
-        self.conflicts_detected = conflicts_detected
+        fields = {
+            "items_synced": items_synced,
+            "transactions_synced": transactions_synced,
+            "conflicts_detected": conflicts_detected
+        }
         if sync_data:
-            self.sync_data = sync_data
-        self.calculate_duration()
-        self.save()
-    
+            fields["sync_data"] = sync_data
+        self.update(_finalize(self.name, "Completed", start_time=self.start_time, **fields))
+
     def mark_failed(self, error_message):
         """Mark sync operation as failed"""
-        self.sync_status = "Failed"
-        self.end_time = now()
-        self.error_details = error_message
-        self.calculate_duration()
-        self.save()
+        self.update(_finalize(self.name, "Failed", start_time=self.start_time,
+            error_details=error_message))
     
     def mark_in_progress(self):
-        """Mark sync operation as in progress"""
+        """Mark sync operation as in progress
+
+        Only the status changes, so a targeted UPDATE replaces the full
+        save that re-ran validation and reserialized the whole row.
+        """
         self.sync_status = "In Progress"
-        self.save()
+        frappe.db.set_value("POS Sync Log", self.name, "sync_status", "In Progress")
+
+
+def _finalize(name, status, start_time=None, **fields):
+    """Finalize a sync log with one targeted UPDATE
+
+    A full doc.save() reloads the row, re-runs validation and rewrites
+    every column just to flip a handful of scalars. This computes the
+    duration in Python and writes only the changed columns through
+    frappe.db.set_value. Returns the written values so callers can keep
+    an in-memory document consistent.
+    """
+    end_time = now()
+    values = {"sync_status": status, "end_time": end_time}
+
+    if start_time is None:
+        start_time = frappe.db.get_value("POS Sync Log", name, "start_time")
+    if start_time:
+        values["duration"] = int(
+            (get_datetime(end_time) - get_datetime(start_time)).total_seconds())
+
+    values.update(fields)
+    frappe.db.set_value("POS Sync Log", name, values)
+    _clear_sync_stats_cache()
+    return values
+
+
+def finalize_sync_logs(updates):
+    """Finalize many sync logs in one round-trip
+
+    Takes a list of (name, status, duration) tuples from bulk ingest
+    paths and issues a single executemany UPDATE with one shared
+    end_time, instead of one set_value per log.
+    """
+    if not updates:
+        return
+
+    end_time = now()
+    frappe.db._cursor.executemany("""
+        UPDATE `tabPOS Sync Log`
+        SET sync_status = %s, end_time = %s, duration = %s
+        WHERE name = %s
+    """, [(status, end_time, duration, name) for name, status, duration in updates])
+    _clear_sync_stats_cache()
+
+
+def _insert_log_worker(log_name, **payload):
+    """Persist a fire-and-forget sync log row off the request thread
+
+    The client's follow-up update_sync_log call can beat this job and
+    upsert a stub row under the pre-generated id first; in that case
+    only the payload fields are filled in, leaving whatever status the
+    update already wrote.
+    """
+    try:
+        sync_log = frappe.new_doc("POS Sync Log")
+        sync_log.update(payload)
+        sync_log.name = log_name
+        sync_log.flags.name_set = True
+        sync_log.insert(ignore_permissions=True)
+    except frappe.DuplicateEntryError:
+        frappe.db.rollback()
+        payload.pop("sync_status", None)
+        frappe.db.set_value("POS Sync Log", log_name, payload)
+    frappe.db.commit()
+    _clear_sync_stats_cache()
+
+
+def _get_or_create_log(sync_log_id, sync_status="Started"):
+    """Load a sync log by its pre-generated id, creating a stub on miss
+
+    create_sync_log returns the id before the enqueued insert commits,
+    so an update can legitimately arrive for a row that does not exist
+    yet. The stub reserves the name; the worker's insert then becomes
+    the losing side of the upsert and only fills in its payload.
+    """
+    try:
+        return frappe.get_doc("POS Sync Log", sync_log_id)
+    except frappe.DoesNotExistError:
+        frappe.clear_last_message()
+        sync_log = frappe.new_doc("POS Sync Log")
+        sync_log.sync_status = sync_status
+        sync_log.name = sync_log_id
+        sync_log.flags.name_set = True
+        sync_log.insert(ignore_permissions=True, ignore_mandatory=True)
+        return sync_log
 
 
 @frappe.whitelist()
 def create_sync_log(device_id, sync_type, sync_status="Started", sync_data=None):
-    """Create a new sync log entry"""
-    
+    """Create a new sync log entry
+
+    Started/In Progress rows are fire-and-forget for the POS client, so
+    they are persisted by a background worker and the endpoint returns
+    the pre-generated log id immediately; update_sync_log later upserts
+    against that id. Terminal statuses stay synchronous because the
+    caller needs the persisted row.
+    """
+
     try:
-        # Get device document
-        device = frappe.get_doc("POS Device", {"device_id": device_id})
+        # Resolve the device name without loading the full document
+        device = _resolve_device(device_id)
         if not device:
             frappe.throw(_("Device not found"))
-        
-        # Create sync log
-        sync_log = frappe.new_doc("POS Sync Log")
-        sync_log.update({
+
+        payload = {
             "device": device.name,
             "sync_type": sync_type,
             "sync_status": sync_status,
             "sync_data": sync_data or {}
-        })
-        
+        }
+
+        if sync_status not in ("Completed", "Failed"):
+            log_name = frappe.generate_hash(length=10)
+            frappe.enqueue(
+                "erpnext_pos_integration.doctype.pos_sync_log.pos_sync_log._insert_log_worker",
+                queue="short", log_name=log_name, **payload)
+            return {
+                "status": "success",
+                "sync_log_id": log_name
+            }
+
+        sync_log = frappe.new_doc("POS Sync Log")
+        sync_log.update(payload)
+
         sync_log.save()
         frappe.db.commit()
-        
+        _clear_sync_stats_cache()
+
         return {
             "status": "success",
             "sync_log_id": sync_log.name
@@ -114,15 +272,28 @@ def update_sync_log(sync_log_id, sync_status, items_synced=0, transactions_synce
     """Update sync log entry with results"""
     
     try:
-        sync_log = frappe.get_doc("POS Sync Log", sync_log_id)
-        
+        if sync_status == "In Progress":
+            if frappe.db.exists("POS Sync Log", sync_log_id):
+                # Status-only toggle: no need to load the document
+                frappe.db.set_value("POS Sync Log", sync_log_id, "sync_status", "In Progress")
+            else:
+                # Enqueued insert not committed yet — upsert a stub so
+                # the status is not silently dropped
+                _get_or_create_log(sync_log_id, "In Progress")
+            frappe.db.commit()
+            return {
+                "status": "success",
+                "sync_log_id": sync_log_id,
+                "duration": frappe.db.get_value("POS Sync Log", sync_log_id, "duration")
+            }
+
+        sync_log = _get_or_create_log(sync_log_id)
+
         if sync_status == "Completed":
             sync_log.mark_completed(items_synced, transactions_synced, conflicts_detected, sync_data)
         elif sync_status == "Failed":
             sync_log.mark_failed(error_message or "Unknown error")
-        elif sync_status == "In Progress":
-            sync_log.mark_in_progress()
-        
+
         frappe.db.commit()
         
         return {
@@ -145,56 +316,100 @@ def get_sync_statistics(device_id=None, time_range="24h"):
     """Get sync statistics for device or all devices"""
     
     try:
-        filters = {}
+        # Dashboards poll this endpoint with identical parameters; serve
+        # repeats from Redis for the range-appropriate TTL
+        cache_key = f"pos_sync_stats::{device_id or '*'}::{time_range}"
+        cached = frappe.cache().get_value(cache_key)
+        if cached is not None:
+            return cached
+
+        conditions = []
+        params = {}
         if device_id:
-            device_doc = frappe.get_doc("POS Device", {"device_id": device_id})
-            if device_doc:
-                filters["device"] = device_doc.name
-        
+            device = _resolve_device(device_id)
+            if device:
+                conditions.append("device = %(device)s")
+                params["device"] = device.name
+
         # Add time filter based on range
-        if time_range == "24h":
-            filters["start_time"] = [">=", frappe.utils.add_hours(frappe.utils.now(), -24)]
-        elif time_range == "7d":
-            filters["start_time"] = [">=", frappe.utils.add_days(frappe.utils.now(), -7)]
-        elif time_range == "30d":
-            filters["start_time"] = [">=", frappe.utils.add_days(frappe.utils.now(), -30)]
-        
-        # Get sync logs
-        sync_logs = frappe.get_all("POS Sync Log",
-            filters=filters,
-            fields=["sync_status", "sync_type", "duration", "items_synced", 
-                   "transactions_synced", "conflicts_detected", "start_time"],
-            order_by="start_time desc")
-        
-        # Calculate statistics
-        total_syncs = len(sync_logs)
-        successful_syncs = len([log for log in sync_logs if log.sync_status == "Completed"])
-        failed_syncs = len([log for log in sync_logs if log.sync_status == "Failed"])
-        
-        total_duration = sum([log.duration or 0 for log in sync_logs])
-        avg_duration = total_duration / max(total_syncs, 1)
-        
-        total_items = sum([log.items_synced or 0 for log in sync_logs])
-        total_transactions = sum([log.transactions_synced or 0 for log in sync_logs])
-        total_conflicts = sum([log.conflicts_detected or 0 for log in sync_logs])
-        
+        delta = _RANGES.get(time_range)
+        if delta:
+            conditions.append("start_time >= %(cutoff)s")
+            params["cutoff"] = now_datetime() - delta
+
+        where = " AND ".join(conditions) or "1=1"
+
+        if time_range in ("7d", "30d"):
+            # Sum the hourly-refreshed daily rollup: O(days) rows
+            # instead of scanning every log row in the window
+            rollup_where = "day >= DATE_SUB(CURDATE(), INTERVAL %(days)s DAY)"
+            rollup_params = {"days": 7 if time_range == "7d" else 30}
+            if "device" in params:
+                rollup_where += " AND device = %(device)s"
+                rollup_params["device"] = params["device"]
+
+            totals = frappe.db.sql(f"""
+                SELECT
+                    SUM(total_syncs) as total_syncs,
+                    SUM(successful_syncs) as successful_syncs,
+                    SUM(failed_syncs) as failed_syncs,
+                    SUM(total_duration) as total_duration,
+                    SUM(total_items) as total_items,
+                    SUM(total_transactions) as total_transactions,
+                    SUM(total_conflicts) as total_conflicts
+                FROM `tabPOS Sync Stats Daily`
+                WHERE {rollup_where}
+            """, rollup_params, as_dict=True)[0]
+        else:
+            # 24h stays on the raw table for freshness; one aggregate
+            # computed by the DB engine instead of shipping every
+            # matching row into Python and walking it repeatedly
+            totals = frappe.db.sql(f"""
+                SELECT
+                    COUNT(*) as total_syncs,
+                    SUM(sync_status = 'Completed') as successful_syncs,
+                    SUM(sync_status = 'Failed') as failed_syncs,
+                    SUM(COALESCE(duration, 0)) as total_duration,
+                    SUM(COALESCE(items_synced, 0)) as total_items,
+                    SUM(COALESCE(transactions_synced, 0)) as total_transactions,
+                    SUM(COALESCE(conflicts_detected, 0)) as total_conflicts
+                FROM `tabPOS Sync Log`
+                WHERE {where}
+            """, params, as_dict=True)[0]
+
+        # Bounded second query for the recent list only
+        recent_syncs = frappe.db.sql(f"""
+            SELECT sync_status, sync_type, duration, items_synced,
+                transactions_synced, conflicts_detected, start_time
+            FROM `tabPOS Sync Log`
+            WHERE {where}
+            ORDER BY start_time DESC
+            LIMIT 10
+        """, params, as_dict=True)
+
+        total_syncs = int(totals.total_syncs or 0)
+        successful_syncs = int(totals.successful_syncs or 0)
+
         stats = {
             "total_syncs": total_syncs,
             "successful_syncs": successful_syncs,
-            "failed_syncs": failed_syncs,
+            "failed_syncs": int(totals.failed_syncs or 0),
             "success_rate": (successful_syncs / max(total_syncs, 1)) * 100 if total_syncs > 0 else 0,
-            "average_duration": avg_duration,
-            "total_items_synced": total_items,
-            "total_transactions_synced": total_transactions,
-            "total_conflicts_detected": total_conflicts,
+            "average_duration": (totals.total_duration or 0) / max(total_syncs, 1),
+            "total_items_synced": int(totals.total_items or 0),
+            "total_transactions_synced": int(totals.total_transactions or 0),
+            "total_conflicts_detected": int(totals.total_conflicts or 0),
             "time_range": time_range
         }
-        
-        return {
+
+        result = {
             "status": "success",
             "statistics": stats,
-            "recent_syncs": sync_logs[:10]  # Return recent 10 sync logs
+            "recent_syncs": recent_syncs
         }
+        frappe.cache().set_value(cache_key, result,
+            expires_in_sec=_STATS_TTL.get(time_range, 60))
+        return result
         
     except Exception as e:
         frappe.log_error(f"Sync statistics retrieval failed: {str(e)}", "POS Sync Log")
@@ -209,13 +424,18 @@ def get_device_sync_history(device_id, limit=50):
     """Get sync history for a specific device"""
     
     try:
-        device = frappe.get_doc("POS Device", {"device_id": device_id})
+        device = _resolve_device(device_id)
         if not device:
             return {"status": "error", "message": "Device not found"}
-        
+
+        # Server-side cap so the whitelisted endpoint cannot be asked to
+        # pull the whole table; end_time is omitted since duration
+        # already carries the elapsed time
+        limit = min(int(limit or 50), 500)
+
         sync_history = frappe.get_all("POS Sync Log",
             filters={"device": device.name},
-            fields=["sync_type", "sync_status", "start_time", "end_time", "duration", 
+            fields=["sync_type", "sync_status", "start_time", "duration",
                    "items_synced", "transactions_synced", "conflicts_detected"],
             order_by="start_time desc",
             limit=limit)
@@ -238,29 +458,32 @@ def cleanup_old_sync_logs(days_to_keep=90):
     
     try:
         cutoff_date = frappe.utils.add_days(frappe.utils.now(), -days_to_keep)
-        
-        # Get count of old logs
-        old_logs_count = frappe.db.count("POS Sync Log", {
-            "start_time": ["<", cutoff_date]
-        })
-        
-        if old_logs_count > 0:
-            # Delete old logs (archived status recommended in production)
+
+        # Delete in bounded chunks with a commit between each, so the
+        # purge never holds row locks across the whole backlog or blocks
+        # writers for the duration of one huge transaction
+        chunk_size = 5000
+        total_deleted = 0
+        while True:
             frappe.db.sql("""
-                DELETE FROM `tabPOS Sync Log` 
+                DELETE FROM `tabPOS Sync Log`
                 WHERE start_time < %s
-            """, (cutoff_date,))
-            
+                ORDER BY start_time
+                LIMIT %s
+            """, (cutoff_date, chunk_size))
+            deleted = frappe.db._cursor.rowcount
             frappe.db.commit()
-            
-            frappe.log_error(
-                f"Cleaned up {old_logs_count} old sync log entries older than {days_to_keep} days",
-                "POS Sync Log Cleanup"
-            )
-        
+            total_deleted += max(deleted, 0)
+            if deleted < chunk_size:
+                break
+
+        if total_deleted:
+            logger.info(
+                f"Cleaned up {total_deleted} old sync log entries older than {days_to_keep} days")
+
         return {
             "status": "success",
-            "deleted_count": old_logs_count
+            "deleted_count": total_deleted
         }
         
     except Exception as e:
@@ -0,0 +1,51 @@
+# Copyright (c) 2025, ERPNext and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSSyncStatsDaily(Document):
+    pass
+
+
+def refresh_sync_rollup():
+    """Fold recent POS Sync Log rows into the daily rollup
+
+    Runs hourly as one INSERT ... SELECT with ON DUPLICATE KEY UPDATE,
+    recomputing yesterday and today so the job is idempotent and the
+    current day is never more than an hour stale. The 7d/30d statistics
+    paths then aggregate O(days) rollup rows instead of scanning every
+    log row in the window.
+    """
+    frappe.db.sql("""
+        INSERT INTO `tabPOS Sync Stats Daily`
+            (name, creation, modified, modified_by, owner,
+             day, device, total_syncs, successful_syncs, failed_syncs,
+             total_duration, total_items, total_transactions, total_conflicts)
+        SELECT
+            CONCAT(DATE(start_time), '::', IFNULL(device, '')),
+            NOW(), NOW(), 'Administrator', 'Administrator',
+            DATE(start_time), device,
+            COUNT(*),
+            SUM(sync_status = 'Completed'),
+            SUM(sync_status = 'Failed'),
+            SUM(COALESCE(duration, 0)),
+            SUM(COALESCE(items_synced, 0)),
+            SUM(COALESCE(transactions_synced, 0)),
+            SUM(COALESCE(conflicts_detected, 0))
+        FROM `tabPOS Sync Log`
+        WHERE start_time >= DATE_SUB(CURDATE(), INTERVAL 1 DAY)
+        GROUP BY DATE(start_time), device
+        ON DUPLICATE KEY UPDATE
+            total_syncs = VALUES(total_syncs),
+            successful_syncs = VALUES(successful_syncs),
+            failed_syncs = VALUES(failed_syncs),
+            total_duration = VALUES(total_duration),
+            total_items = VALUES(total_items),
+            total_transactions = VALUES(total_transactions),
+            total_conflicts = VALUES(total_conflicts),
+            modified = NOW()
+    """)
+
+    frappe.db.commit()
@@ -121,26 +121,55 @@ app_license = "MIT"
 #     }
 # }
 
+doc_events = {
+    "Item": {
+        "on_update": "erpnext_pos_integration.utils.pricing_engine.clear_item_info_cache",
+        "on_trash": "erpnext_pos_integration.utils.pricing_engine.clear_item_info_cache"
+    },
+    "POS Device": {
+        "after_insert": "erpnext_pos_integration.api.admin_api.invalidate_system_overview_cache",
+        "on_update": [
+            "erpnext_pos_integration.api.admin_api.invalidate_system_overview_cache",
+            "erpnext_pos_integration.api.pricing_api.invalidate_device_context_cache"
+        ],
+        "on_trash": "erpnext_pos_integration.api.pricing_api.invalidate_device_context_cache"
+    },
+    "POS Pricing Rule": {
+        "after_insert": [
+            "erpnext_pos_integration.utils.pricing_engine.invalidate_pricing_rule_trie",
+            "erpnext_pos_integration.utils.pricing_engine.bump_pricing_rule_version"
+        ],
+        "on_update": [
+            "erpnext_pos_integration.utils.pricing_engine.invalidate_pricing_rule_trie",
+            "erpnext_pos_integration.utils.pricing_engine.bump_pricing_rule_version"
+        ],
+        "on_trash": [
+            "erpnext_pos_integration.utils.pricing_engine.invalidate_pricing_rule_trie",
+            "erpnext_pos_integration.utils.pricing_engine.bump_pricing_rule_version"
+        ]
+    },
+    "POS Sync Log": {
+        "after_insert": "erpnext_pos_integration.api.admin_api.invalidate_system_overview_cache",
+        "on_update": "erpnext_pos_integration.api.admin_api.invalidate_system_overview_cache"
+    }
+}
+
 # Scheduled Tasks
 # ---------------
 
-# scheduler_events = {
-#     "all": [
-#         "erpnext_pos_integration.tasks.all"
-#     ],
-#     "daily": [
-#         "erpnext_pos_integration.tasks.daily"
-#     ],
-#     "hourly": [
-#         "erpnext_pos_integration.tasks.hourly"
-#     ],
-#     "weekly": [
-#         "erpnext_pos_integration.tasks.weekly"
-#     ],
-#     "monthly": [
-#         "erpnext_pos_integration.tasks.monthly"
-#     ],
-# }
+scheduler_events = {
+    "cron": {
+        "*/5 * * * *": [
+            "erpnext_pos_integration.doctype.pos_device.pos_device.flush_device_heartbeats"
+        ]
+    },
+    "hourly": [
+        "erpnext_pos_integration.doctype.pos_sync_stats_daily.pos_sync_stats_daily.refresh_sync_rollup"
+    ],
+    "daily": [
+        "erpnext_pos_integration.doctype.pos_sync_daily_rollup.pos_sync_daily_rollup.rollup_yesterday"
+    ]
+}
 
 # Testing
 # -------
@@ -4,10 +4,14 @@
 import frappe
 from frappe import _
 
+# Informational install messages go to the rotating site log; the Error
+# Log table is reserved for actual failures
+logger = frappe.logger("pos_integration", allow_site=True, file_count=5)
+
 
 def before_install():
 	"""Execute before app installation"""
-	frappe.log_error("Starting ERPNext POS Integration installation", "POS Installation")
+	logger.info("Starting ERPNext POS Integration installation")
 
 
 def after_install():
@@ -25,7 +29,7 @@ def after_install():
 		# Setup permissions
 		setup_permissions()
 		
-		frappe.log_error("ERPNext POS Integration installation completed successfully", "POS Installation")
+		logger.info("ERPNext POS Integration installation completed successfully")
 		
 	except Exception as e:
 		frappe.log_error(f"Error during POS installation: {str(e)}", "POS Installation Error")
@@ -34,7 +38,7 @@ def after_install():
 
 def before_uninstall():
 	"""Execute before app uninstallation"""
-	frappe.log_error("Starting ERPNext POS Integration uninstallation", "POS Uninstallation")
+	logger.info("Starting ERPNext POS Integration uninstallation")
 
 
 def after_uninstall():
@@ -46,7 +50,7 @@ def after_uninstall():
 		# Remove configurations
 		cleanup_configurations()
 		
-		frappe.log_error("ERPNext POS Integration uninstallation completed", "POS Uninstallation")
+		logger.info("ERPNext POS Integration uninstallation completed")
 		
 	except Exception as e:
 		frappe.log_error(f"Error during POS uninstallation: {str(e)}", "POS Uninstallation Error")
@@ -95,8 +99,17 @@ def create_custom_fields():
 		}
 	]
 	
+	# One prefetch of the existing fields instead of an exists() query
+	# per field; the diff happens in Python
+	existing = set(
+		(row.dt, row.fieldname)
+		for row in frappe.get_all("Custom Field",
+			filters={"dt": ["in", ["Sales Invoice", "Item"]]},
+			fields=["dt", "fieldname"])
+	)
+
 	for field in custom_fields:
-		if not frappe.db.exists("Custom Field", {"dt": field["dt"], "fieldname": field["fieldname"]}):
+		if (field["dt"], field["fieldname"]) not in existing:
 			doc = frappe.get_doc({
 				"doctype": "Custom Field",
 				"dt": field["dt"],
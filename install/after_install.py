@@ -4,6 +4,10 @@
 import frappe
 from frappe import _
 
+# Informational install messages go to the rotating site log; the Error
+# Log table is reserved for actual failures
+logger = frappe.logger("pos_integration", allow_site=True, file_count=5)
+
 
 def after_install():
 	"""Execute after successful app installation"""
@@ -29,7 +33,7 @@ def after_install():
 		
 		frappe.db.commit()
 		
-		frappe.log_error("ERPNext POS Integration installation completed successfully", "POS Installation")
+		logger.info("ERPNext POS Integration installation completed successfully")
 		
 		return True
 		
@@ -107,25 +111,50 @@ def create_custom_fields():
 		}
 	]
 	
-	for field in custom_fields:
-		if not frappe.db.exists("Custom Field", {"dt": field["dt"], "fieldname": field["fieldname"]}):
-			try:
-				doc = frappe.get_doc({
-					"doctype": "Custom Field",
-					"dt": field["dt"],
-					"fieldname": field["fieldname"],
-					"fieldtype": field["fieldtype"],
-					"label": field["label"],
-					"description": field.get("description", ""),
-					"default": field.get("default"),
-					"unique": field.get("unique", 0),
-					"options": field.get("options"),
-					"insert_after": field.get("insert_after")
-				})
-				doc.insert(ignore_permissions=True)
-				frappe.db.commit()
-			except Exception as e:
-				frappe.log_error(f"Error creating custom field {field['fieldname']}: {str(e)}", "POS Installation")
+	# One prefetch of the existing fields instead of an exists() query
+	# per field, and one commit at the end instead of one per insert
+	existing = set(
+		(row.dt, row.fieldname)
+		for row in frappe.get_all("Custom Field",
+			filters={"dt": ["in", ["Sales Invoice", "Item"]]},
+			fields=["dt", "fieldname"])
+	)
+
+	missing = [field for field in custom_fields
+		if (field["dt"], field["fieldname"]) not in existing]
+	if not missing:
+		return
+
+	# The field list is static, so skip the per-doc validate/autoname/
+	# hook machinery and write all rows in one INSERT; the meta cache is
+	# then refreshed once per affected parent doctype
+	now_ts = frappe.utils.now()
+	columns = ["name", "creation", "modified", "modified_by", "owner",
+		"dt", "fieldname", "fieldtype", "label", "description",
+		"default", "unique", "options", "insert_after"]
+	values = [
+		(f"{field['dt']}-{field['fieldname']}", now_ts, now_ts,
+		 "Administrator", "Administrator",
+		 field["dt"], field["fieldname"], field["fieldtype"], field["label"],
+		 field.get("description", ""), field.get("default"),
+		 field.get("unique", 0), field.get("options"), field.get("insert_after"))
+		for field in missing
+	]
+
+	try:
+		frappe.db.bulk_insert("Custom Field", fields=columns, values=values)
+	except Exception as e:
+		frappe.log_error(f"Error bulk-inserting custom fields: {str(e)}", "POS Installation")
+		return
+
+	for dt in set(field["dt"] for field in missing):
+		frappe.clear_cache(doctype=dt)
+		# bulk_insert bypasses CustomField.on_update, which is what would
+		# have synced the schema — add the physical columns ourselves or
+		# the first save of these doctypes fails with unknown columns
+		frappe.db.updatedb(dt)
+
+	frappe.db.commit()
 
 
 def setup_initial_config():
@@ -220,19 +249,32 @@ def setup_permissions():
 
 
 def create_database_indexes():
-	"""Create database indexes for better performance"""
-	
-	indexes = [
-		"CREATE INDEX IF NOT EXISTS idx_pos_device_branch ON `tabPOS Device`(branch)",
-		"CREATE INDEX IF NOT EXISTS idx_pos_device_status ON `tabPOS Device`(sync_status)",
-		"CREATE INDEX IF NOT EXISTS idx_pos_pricing_active ON `tabPOS Pricing Rule`(is_active, priority_level)",
-		"CREATE INDEX IF NOT EXISTS idx_pos_pricing_item ON `tabPOS Pricing Rule`(item_code)",
-		"CREATE INDEX IF NOT EXISTS idx_pos_sync_status ON `tabPOS Sync Log`(sync_status, creation)"
+	"""Create database indexes for better performance
+
+	One ALTER TABLE per table batches the index additions into a single
+	round-trip and one metadata lock instead of a statement per index.
+	The sync log also gets a covering index for the statistics aggregate
+	(start_time range scan reading sync_status/device/duration from the
+	index) and (device, start_time) so per-device history is an index
+	range scan with no filesort.
+	"""
+
+	alter_statements = [
+		"""ALTER TABLE `tabPOS Device`
+			ADD INDEX IF NOT EXISTS idx_pos_device_branch (branch),
+			ADD INDEX IF NOT EXISTS idx_pos_device_status (sync_status)""",
+		"""ALTER TABLE `tabPOS Pricing Rule`
+			ADD INDEX IF NOT EXISTS idx_pos_pricing_active (is_active, priority_level),
+			ADD INDEX IF NOT EXISTS idx_pos_pricing_item (item_code)""",
+		"""ALTER TABLE `tabPOS Sync Log`
+			ADD INDEX IF NOT EXISTS idx_pos_sync_status (sync_status, creation),
+			ADD INDEX IF NOT EXISTS idx_pos_sync_stats_cover (start_time, sync_status, device, duration),
+			ADD INDEX IF NOT EXISTS idx_pos_sync_device_time (device, start_time)"""
 	]
-	
-	for index_sql in indexes:
+
+	for alter_sql in alter_statements:
 		try:
-			frappe.db.sql(index_sql)
+			frappe.db.sql(alter_sql)
 		except Exception as e:
 			frappe.log_error(f"Error creating index: {str(e)}", "POS Installation")
 
@@ -0,0 +1,21 @@
+# Copyright (c) 2025, ERPNext and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def execute():
+	"""Index the hot lookup paths for rules and devices
+
+	Rule loads filter is_active and sort by erpnext_priority, credential
+	checks seek on device_id, and the device statistics aggregate groups
+	sync_status over registered devices; each gets a matching index so
+	none of them falls back to a full scan or filesort.
+	"""
+
+	try:
+		frappe.db.add_index("POS Pricing Rule", ["is_active", "erpnext_priority"])
+		frappe.db.add_index("POS Device", ["device_id"])
+		frappe.db.add_index("POS Device", ["sync_status", "is_registered"])
+	except Exception as e:
+		frappe.log_error(f"Error adding hot query indexes: {str(e)}", "POS Hot Query Indexes")
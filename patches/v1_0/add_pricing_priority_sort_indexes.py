@@ -0,0 +1,37 @@
+# Copyright (c) 2025, ERPNext and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def execute():
+	"""Add priority-ordered composite indexes for the candidate rule query
+
+	get_applicable_pricing_rules filters on is_active plus one scoping
+	column and orders by erpnext_priority DESC; with erpnext_priority as
+	the trailing column each lookup becomes an index range scan that
+	already yields priority order, so MySQL never filesorts the
+	candidates.
+	"""
+
+	indexes = [
+		("idx_pos_pr_active_item_prio", "(is_active, item_code, erpnext_priority)"),
+		("idx_pos_pr_active_group_prio", "(is_active, item_group, erpnext_priority)"),
+		("idx_pos_pr_active_brand_prio", "(is_active, brand, erpnext_priority)"),
+	]
+
+	for index_name, columns in indexes:
+		index_exists = frappe.db.sql("""
+			SHOW INDEX FROM `tabPOS Pricing Rule`
+			WHERE Key_name = %(index_name)s
+		""", {"index_name": index_name})
+		if index_exists:
+			continue
+
+		try:
+			frappe.db.sql(f"""
+				CREATE INDEX {index_name}
+				ON `tabPOS Pricing Rule` {columns}
+			""")
+		except Exception as e:
+			frappe.log_error(f"Error adding index {index_name}: {str(e)}", "POS Pricing Rule Indexes")
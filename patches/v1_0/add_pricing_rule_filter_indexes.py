@@ -0,0 +1,28 @@
+# Copyright (c) 2025, ERPNext and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def execute():
+	"""Add a filter index for the POS Pricing Rule candidate scans
+
+	The rule cache rebuild and any ad hoc lookups filter on is_active and
+	narrow by item_code/item_group and the validity window, so those
+	columns form one composite index with is_active leading.
+	"""
+
+	index_exists = frappe.db.sql("""
+		SHOW INDEX FROM `tabPOS Pricing Rule`
+		WHERE Key_name = 'idx_pricing_rule_active_filters'
+	""")
+	if index_exists:
+		return
+
+	try:
+		frappe.db.sql("""
+			CREATE INDEX idx_pricing_rule_active_filters
+			ON `tabPOS Pricing Rule` (is_active, item_code, item_group, valid_from, valid_upto)
+		""")
+	except Exception as e:
+		frappe.log_error(f"Error adding pricing rule filter index: {str(e)}", "POS Pricing Rule Indexes")
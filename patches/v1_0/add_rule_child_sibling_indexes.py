@@ -0,0 +1,19 @@
+# Copyright (c) 2025, ERPNext and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def execute():
+	"""Index the sibling-duplicate lookups on the rule child tables
+
+	The child validators look up duplicate siblings by parent plus the
+	condition value, so each child table gets a composite index covering
+	that filter.
+	"""
+
+	try:
+		frappe.db.add_index("POS Pricing Rule Branch", ["parent", "branch_id"])
+		frappe.db.add_index("POS Pricing Rule Days", ["parent", "day_of_week"])
+	except Exception as e:
+		frappe.log_error(f"Error adding rule child indexes: {str(e)}", "POS Rule Child Indexes")
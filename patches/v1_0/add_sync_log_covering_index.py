@@ -0,0 +1,28 @@
+# Copyright (c) 2025, ERPNext and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def execute():
+	"""Add a covering index for the POS Sync Log monitoring queries
+
+	The monitoring endpoints all filter by a creation range and aggregate
+	on status/device_name/sync_type, so creation leads the index and the
+	remaining columns make the scans index-only.
+	"""
+
+	index_exists = frappe.db.sql("""
+		SHOW INDEX FROM `tabPOS Sync Log`
+		WHERE Key_name = 'idx_sync_log_creation_status'
+	""")
+	if index_exists:
+		return
+
+	try:
+		frappe.db.sql("""
+			CREATE INDEX idx_sync_log_creation_status
+			ON `tabPOS Sync Log` (creation, status, device_name, sync_type, completion_time)
+		""")
+	except Exception as e:
+		frappe.log_error(f"Error adding covering index: {str(e)}", "POS Sync Log Indexes")
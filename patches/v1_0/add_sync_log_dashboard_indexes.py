@@ -0,0 +1,22 @@
+# Copyright (c) 2025, ERPNext and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def execute():
+	"""Add composite indexes to POS Sync Log for the admin dashboard aggregates"""
+
+	indexes = [
+		["creation", "status"],
+		["device_name", "creation"],
+		["pricing_rule", "status"],
+		["status", "creation"],
+		["sync_type", "status", "creation"]
+	]
+
+	for fields in indexes:
+		try:
+			frappe.db.add_index("POS Sync Log", fields)
+		except Exception as e:
+			frappe.log_error(f"Error adding index on {fields}: {str(e)}", "POS Sync Log Indexes")
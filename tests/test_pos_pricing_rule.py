@@ -1,14 +1,33 @@
 # Copyright (c) 2025, Muhammad Hafla and contributors
 # For license information, please see license.txt
 
-import frappe
+import types
 import unittest
 
+import frappe
+
+from erpnext_pos_integration.doctype.pos_pricing_rule.pos_pricing_rule import POSPricingRule
+
+# Expected priority level -> ERPNext priority mapping; read-only so no
+# test can mutate the expectations another test asserts against
+_PRIORITY_MAP = types.MappingProxyType({
+    "1": 20,  # Base Item Price
+    "2": 19,  # Branch Price Override
+    "3": 18,  # Member/Customer Price
+    "4": 17,  # Time-based Promotion
+    "5": 16,  # Quantity Break Discount
+    "6": 15,  # Spend X Discount
+    "7": 14,  # Buy X Get Y (BXGY)
+    "8": 13   # Manual Override
+})
+
+
 class TestPOSPricingRule(unittest.TestCase):
     def setUp(self):
         """Set up test data"""
-        # Create test pricing rule
-        self.pricing_rule = frappe.get_doc({
+        # Validation and calculation are pure document logic, so the
+        # rule is built in memory and never inserted
+        self.pricing_rule = POSPricingRule({
             "doctype": "POS Pricing Rule",
             "rule_name": "Test Pricing Rule",
             "pricing_type": "Base Price",
@@ -19,22 +38,13 @@ class TestPOSPricingRule(unittest.TestCase):
         
     def test_priority_mapping(self):
         """Test priority level to ERPNext mapping"""
-        # Test each priority level
-        priority_mapping = {
-            "1": 20,  # Base Item Price
-            "2": 19,  # Branch Price Override  
-            "3": 18,  # Member/Customer Price
-            "4": 17,  # Time-based Promotion
-            "5": 16,  # Quantity Break Discount
-            "6": 15,  # Spend X Discount
-            "7": 14,  # Buy X Get Y (BXGY)
-            "8": 13   # Manual Override
-        }
-        
-        for level, expected_erpnext_priority in priority_mapping.items():
-            self.pricing_rule.priority_level = level
-            self.pricing_rule.validate_priority_mapping()
-            self.assertEqual(self.pricing_rule.erpnext_priority, expected_erpnext_priority)
+        # subTest keeps the remaining levels running (and reported
+        # individually) when one mapping is wrong
+        for level, expected_erpnext_priority in _PRIORITY_MAP.items():
+            with self.subTest(level=level):
+                self.pricing_rule.priority_level = level
+                self.pricing_rule.validate_priority_mapping()
+                self.assertEqual(self.pricing_rule.erpnext_priority, expected_erpnext_priority)
             
     def test_invalid_priority_level(self):
         """Test invalid priority level validation"""
@@ -143,10 +153,6 @@ class TestPOSPricingRule(unittest.TestCase):
     def test_export_pricing_rules(self):
         """Test pricing rules export functionality"""
         # This would test the export functionality if implemented
-        # Currently just testing that the function exists
-        self.assertTrue(hasattr(frappe.get_doc('POS Pricing Rule', self.pricing_rule.name), 'export_pricing_rules'))
-        
-    def tearDown(self):
-        """Clean up test data"""
-        if self.pricing_rule.name:
-            frappe.delete_doc("POS Pricing Rule", self.pricing_rule.name, force=True)
\ No newline at end of file
+        # Currently just testing that the method exists on the class;
+        # no document fetch is needed for that
+        self.assertTrue(hasattr(POSPricingRule, 'export_pricing_rules'))
\ No newline at end of file
@@ -7,7 +7,13 @@ from frappe import _
 
 def after_uninstall():
 	"""Execute after successful app uninstallation"""
-	
+
+	# Both hook wirings can end up invoking this cleanup; the flag makes
+	# the second invocation a no-op instead of a 2x DB pass that races on
+	# commits and logs "not found" errors
+	if frappe.flags.get("pos_uninstall_done"):
+		return True
+
 	try:
 		# Clean up custom fields
 		cleanup_custom_fields()
@@ -25,9 +31,11 @@ def after_uninstall():
 		cleanup_cache()
 		
 		frappe.db.commit()
-		
+
+		frappe.flags.pos_uninstall_done = True
+
 		frappe.log_error("ERPNext POS Integration uninstallation completed", "POS Uninstallation")
-		
+
 		return True
 		
 	except Exception as e:
@@ -38,23 +46,40 @@ def after_uninstall():
 
 def cleanup_custom_fields():
 	"""Remove custom fields during uninstallation"""
-	
+
 	try:
-		# Remove custom fields
-		custom_field_names = frappe.get_all("Custom Field", 
-			filters={"dt": ["in", ["Sales Invoice", "Item"]]},
-			fields=["name", "dt", "fieldname"]
-		)
-		
-		for field in custom_field_names:
-			try:
-				frappe.delete_doc("Custom Field", field.name)
-				frappe.db.commit()
-			except Exception as e:
-				frappe.log_error(f"Error removing custom field {field.fieldname} from {field.dt}: {str(e)}", "POS Uninstallation")
-		
+		# One set-based DELETE instead of a delete_doc (controller hooks,
+		# version rows) and a commit fsync per field
+		frappe.db.sql("""
+			DELETE FROM `tabCustom Field`
+			WHERE dt IN ('Sales Invoice', 'Item')
+		""")
+
+		for dt in ("Sales Invoice", "Item"):
+			frappe.clear_cache(doctype=dt)
+
+		frappe.db.commit()
+
 	except Exception as e:
-		frappe.log_error(f"Error cleaning up custom fields: {str(e)}", "POS Uninstallation")
+		frappe.log_error(f"Error bulk-removing custom fields: {str(e)}", "POS Uninstallation")
+		_cleanup_custom_fields_per_row()
+
+
+def _cleanup_custom_fields_per_row():
+	"""Per-row fallback when the bulk DELETE fails"""
+
+	custom_field_names = frappe.get_all("Custom Field",
+		filters={"dt": ["in", ["Sales Invoice", "Item"]]},
+		fields=["name", "dt", "fieldname"]
+	)
+
+	for field in custom_field_names:
+		try:
+			frappe.delete_doc("Custom Field", field.name)
+		except Exception as e:
+			frappe.log_error(f"Error removing custom field {field.fieldname} from {field.dt}: {str(e)}", "POS Uninstallation")
+
+	frappe.db.commit()
 
 
 def cleanup_configurations():
@@ -69,18 +94,31 @@ def cleanup_configurations():
 			except Exception as e:
 				frappe.log_error(f"Error removing POS settings: {str(e)}", "POS Uninstallation")
 		
-		# Remove default pricing rules
-		default_rules = frappe.get_all("POS Pricing Rule", 
-			filters={"rule_name": ["like", "Default%"]},
-			fields=["name"]
-		)
-		
-		for rule in default_rules:
-			try:
-				frappe.delete_doc("POS Pricing Rule", rule.name)
-				frappe.db.commit()
-			except Exception as e:
-				frappe.log_error(f"Error removing pricing rule {rule.name}: {str(e)}", "POS Uninstallation")
+		# Remove default pricing rules in one statement per table:
+		# child rows first to respect FK order, then the parents
+		try:
+			frappe.db.sql("""
+				DELETE FROM `tabPOS Pricing Rule Branch`
+				WHERE parent IN (
+					SELECT name FROM `tabPOS Pricing Rule`
+					WHERE rule_name LIKE 'Default%%'
+				)
+			""")
+			frappe.db.sql("""
+				DELETE FROM `tabPOS Pricing Rule Days`
+				WHERE parent IN (
+					SELECT name FROM `tabPOS Pricing Rule`
+					WHERE rule_name LIKE 'Default%%'
+				)
+			""")
+			frappe.db.sql("""
+				DELETE FROM `tabPOS Pricing Rule`
+				WHERE rule_name LIKE 'Default%%'
+			""")
+			frappe.db.commit()
+		except Exception as e:
+			frappe.log_error(f"Error bulk-removing default pricing rules: {str(e)}", "POS Uninstallation")
+			_cleanup_default_rules_paged()
 		
 		# Remove DocType if no other instances exist
 		if frappe.db.exists("DocType", "POS Integration Settings"):
@@ -96,22 +134,51 @@ def cleanup_configurations():
 		frappe.log_error(f"Error cleaning up configurations: {str(e)}", "POS Uninstallation")
 
 
+def _cleanup_default_rules_paged():
+	"""Paged fallback when the set-based default-rule DELETE fails"""
+
+	while True:
+		names = frappe.get_all("POS Pricing Rule",
+			filters={"rule_name": ["like", "Default%"]},
+			pluck="name",
+			limit=500
+		)
+		if not names:
+			break
+		try:
+			frappe.db.delete("POS Pricing Rule", {"name": ["in", names]})
+			frappe.db.commit()
+		except Exception as e:
+			frappe.log_error(f"Error removing default pricing rules: {str(e)}", "POS Uninstallation")
+			break
+
+
 def cleanup_indexes():
-	"""Remove database indexes created during installation"""
-	
-	indexes = [
-		"DROP INDEX IF EXISTS idx_pos_device_branch ON `tabPOS Device`",
-		"DROP INDEX IF EXISTS idx_pos_device_status ON `tabPOS Device`",
-		"DROP INDEX IF EXISTS idx_pos_pricing_active ON `tabPOS Pricing Rule`",
-		"DROP INDEX IF EXISTS idx_pos_pricing_item ON `tabPOS Pricing Rule`",
-		"DROP INDEX IF EXISTS idx_pos_sync_status ON `tabPOS Sync Log`"
+	"""Remove database indexes created during installation
+
+	One ALTER TABLE per table drops all of its indexes in a single
+	round-trip and one metadata lock cycle instead of a DDL statement
+	(and lock acquire) per index.
+	"""
+
+	alter_statements = [
+		"""ALTER TABLE `tabPOS Device`
+			DROP INDEX IF EXISTS idx_pos_device_branch,
+			DROP INDEX IF EXISTS idx_pos_device_status""",
+		"""ALTER TABLE `tabPOS Pricing Rule`
+			DROP INDEX IF EXISTS idx_pos_pricing_active,
+			DROP INDEX IF EXISTS idx_pos_pricing_item""",
+		"""ALTER TABLE `tabPOS Sync Log`
+			DROP INDEX IF EXISTS idx_pos_sync_status,
+			DROP INDEX IF EXISTS idx_pos_sync_stats_cover,
+			DROP INDEX IF EXISTS idx_pos_sync_device_time"""
 	]
-	
-	for index_sql in indexes:
+
+	for alter_sql in alter_statements:
 		try:
-			frappe.db.sql(index_sql)
+			frappe.db.sql(alter_sql)
 		except Exception as e:
-			frappe.log_error(f"Error dropping index: {str(e)}", "POS Uninstallation")
+			frappe.log_error(f"Error dropping indexes: {str(e)}", "POS Uninstallation")
 
 
 def cleanup_permissions():
@@ -119,40 +186,61 @@ def cleanup_permissions():
 	
 	try:
 		roles = ["System Manager", "POS User", "ERPNext Manager"]
-		
-		for role in roles:
-			if frappe.db.exists("Role", role):
-				# Remove permissions for custom doctypes
-				for doctype in ["POS Device", "POS Pricing Rule", "POS Sync Log"]:
-					try:
-						# Remove all permissions for this doctype and role
-						frappe.db.sql("""
-							DELETE FROM `tabCustom DocPerm` 
-							WHERE role = %s AND parent = %s
-						""", (role, doctype))
-					except Exception as e:
-						frappe.log_error(f"Error removing permissions for {doctype} and {role}: {str(e)}", "POS Uninstallation")
-		
+		doctypes = ["POS Device", "POS Pricing Rule", "POS Sync Log"]
+
+		# One lookup replaces the per-role exists() checks, and one
+		# set-based DELETE replaces the statement per role/doctype pair
+		existing_roles = frappe.db.sql_list("""
+			SELECT name FROM `tabRole` WHERE name IN %(roles)s
+		""", {"roles": roles})
+
+		if existing_roles:
+			frappe.db.sql("""
+				DELETE FROM `tabCustom DocPerm`
+				WHERE role IN %(roles)s AND parent IN %(doctypes)s
+			""", {"roles": existing_roles, "doctypes": doctypes})
+
 		frappe.db.commit()
-		
+
 	except Exception as e:
 		frappe.log_error(f"Error cleaning up permissions: {str(e)}", "POS Uninstallation")
 
 
 def cleanup_cache():
 	"""Remove cached data related to POS integration"""
-	
+
 	try:
-		# Clear pricing cache
-		frappe.cache().delete_keys("pricing|")
-		
-		# Clear device cache
-		frappe.cache().delete_keys("pos_device|")
-		
-		# Clear sync cache
-		frappe.cache().delete_keys("pos_sync|")
-		
+		cache = frappe.cache()
+
+		# Clear pricing, device and sync caches
+		for prefix in ("pricing|", "pos_device|", "pos_sync|"):
+			_unlink_by_prefix(cache, prefix)
+
 		frappe.log_error("POS integration cache cleared", "POS Uninstallation")
-		
+
 	except Exception as e:
-		frappe.log_error(f"Error clearing cache: {str(e)}", "POS Uninstallation")
\ No newline at end of file
+		frappe.log_error(f"Error clearing cache: {str(e)}", "POS Uninstallation")
+
+
+def _unlink_by_prefix(cache, prefix, batch_size=500):
+	"""Drop all keys under a prefix without blocking the Redis server
+
+	delete_keys runs KEYS prefix* — one O(keyspace) blocking scan that
+	stalls every concurrent caller on a large tenant. SCAN iterates the
+	keyspace in cursor-sized steps and UNLINK frees the values off the
+	main thread, batched through a pipeline. Servers without UNLINK
+	(pre-Redis 4) fall back to the old delete_keys path.
+	"""
+	try:
+		pipe = cache.pipeline()
+		pending = 0
+		for key in cache.scan_iter(match=cache.make_key(prefix + "*"), count=1000):
+			pipe.unlink(key)
+			pending += 1
+			if pending >= batch_size:
+				pipe.execute()
+				pending = 0
+		if pending:
+			pipe.execute()
+	except Exception:
+		cache.delete_keys(prefix)
\ No newline at end of file
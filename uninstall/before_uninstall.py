@@ -12,15 +12,21 @@ def before_uninstall():
 	if "System Manager" not in frappe.get_roles():
 		frappe.throw(_("You need System Manager permissions to uninstall this app."))
 	
-	# Check for active POS devices
-	active_devices = frappe.db.count("POS Device", {"sync_status": ["in", ["Online", "Syncing"]]})
-	if active_devices > 0:
-		frappe.throw(_("Cannot uninstall while {0} POS devices are still active. Please deactivate all devices first.").format(active_devices))
-	
-	# Check for pending sync operations
-	pending_syncs = frappe.db.count("POS Sync Log", {"sync_status": "Pending"})
-	if pending_syncs > 0:
-		frappe.throw(_("Cannot uninstall while {0} sync operations are pending. Please wait for sync to complete.").format(pending_syncs))
+	# Check for active POS devices and pending sync operations in one
+	# round-trip instead of two separate counts
+	row = frappe.db.sql("""
+		SELECT
+			(SELECT COUNT(*) FROM `tabPOS Device`
+			 WHERE sync_status IN ('Online', 'Syncing')) AS active,
+			(SELECT COUNT(*) FROM `tabPOS Sync Log`
+			 WHERE sync_status = 'Pending') AS pending
+	""", as_dict=True)[0]
+
+	if row.active > 0:
+		frappe.throw(_("Cannot uninstall while {0} POS devices are still active. Please deactivate all devices first.").format(row.active))
+
+	if row.pending > 0:
+		frappe.throw(_("Cannot uninstall while {0} sync operations are pending. Please wait for sync to complete.").format(row.pending))
 	
 	# Log uninstallation start
 	frappe.log_error("Starting ERPNext POS Integration uninstallation", "POS Uninstallation")
@@ -3,12 +3,247 @@
 
 import frappe
 from frappe import _
-from frappe.utils import now, add_hours, getdate, flt, cint
+from frappe.utils import now, add_hours, getdate, get_datetime, flt, cint
+from erpnext_pos_integration.doctype.pos_pricing_rule.pos_pricing_rule import RULE_COLUMNS
 from datetime import datetime, timedelta
+import hashlib
 import json
+import pickle
+import redis
+import struct
 import time
 import threading
-from functools import lru_cache
+from collections import defaultdict
+from functools import lru_cache, wraps
+
+try:
+    import orjson
+
+    def _cache_dumps(obj):
+        # default=str covers the timedelta Time fields, which orjson
+        # does not serialize natively
+        return orjson.dumps(obj, default=str)
+    _cache_loads = orjson.loads
+except ImportError:
+    def _cache_dumps(obj):
+        return json.dumps(obj, default=str)
+    _cache_loads = json.loads
+
+# What a cache probe may legitimately fail with: Redis transport
+# errors, malformed or legacy payloads, and an uninitialized cache
+# client (unit tests). Anything else — including KeyboardInterrupt and
+# SystemExit, which the old bare excepts swallowed — propagates.
+_CACHE_ERRORS = (redis.RedisError, AttributeError, TypeError, ValueError, KeyError)
+
+RULE_TRIE_CACHE_KEY = "pos_pricing_rule_trie"
+
+
+def _request_clock():
+    """Current timestamp and date, computed once per request
+
+    Every line of a basket builds a transaction context; parking one
+    (now, today) pair on frappe.local means a 200-line cart performs
+    the datetime construction once instead of 200 times, and sibling
+    calls within the same HTTP request agree on the time.
+    """
+    clock = getattr(frappe.local, 'pos_pricing_clock', None)
+    if clock is None:
+        clock = frappe.local.pos_pricing_clock = (now(), getdate())
+    return clock
+
+
+def _trie_insert(trie, key, rule_name):
+    """Insert a rule name into a character trie under the given key"""
+    node = trie
+    for char in key:
+        node = node.setdefault(char, {})
+    node.setdefault('_rules', []).append(rule_name)
+
+
+def _trie_collect(trie, key):
+    """Union the rule names stored along the key's character path
+
+    Rules indexed under a prefix of the key (SKU families share prefixes)
+    are picked up as candidates in O(len(key)) pointer chases.
+    """
+    names = set()
+    node = trie
+    for char in key:
+        node = node.get(char)
+        if node is None:
+            break
+        names.update(node.get('_rules', []))
+    return names
+
+
+def build_pricing_rule_tries():
+    """Build the in-memory trie index of active pricing rules
+
+    Each rule is indexed under its most specific non-empty key; rules
+    with no item or customer keys apply everywhere and go into 'generic'.
+    """
+    tries = {
+        'item_code': {},
+        'item_group': {},
+        'customer_group': {},
+        'generic': []
+    }
+
+    rules = frappe.db.sql("""
+        SELECT name, item_code, item_group, customer_group
+        FROM `tabPOS Pricing Rule`
+        WHERE is_active = 1
+    """, as_dict=True)
+
+    for rule in rules:
+        if rule.item_code:
+            _trie_insert(tries['item_code'], rule.item_code, rule.name)
+        elif rule.item_group:
+            _trie_insert(tries['item_group'], rule.item_group, rule.name)
+        elif rule.customer_group:
+            _trie_insert(tries['customer_group'], rule.customer_group, rule.name)
+        else:
+            tries['generic'].append(rule.name)
+
+    return tries
+
+
+def get_pricing_rule_tries():
+    """Get the rule trie index from Redis, rebuilding it when missing"""
+    cached = frappe.cache().get_value(RULE_TRIE_CACHE_KEY)
+    if cached:
+        try:
+            return pickle.loads(cached)
+        except Exception:
+            pass
+
+    tries = build_pricing_rule_tries()
+    frappe.cache().set_value(RULE_TRIE_CACHE_KEY, pickle.dumps(tries))
+    return tries
+
+
+def get_candidate_rule_names(item_code=None, item_group=None, customer_group=None):
+    """Get names of rules that could apply to the given context
+
+    Trie traversal replaces the per-call table scan; callers still run
+    is_applicable on the candidates to enforce the exact filters.
+    """
+    tries = get_pricing_rule_tries()
+    names = set(tries['generic'])
+
+    if item_code:
+        names.update(_trie_collect(tries['item_code'], item_code))
+    if item_group:
+        names.update(_trie_collect(tries['item_group'], item_group))
+    if customer_group:
+        names.update(_trie_collect(tries['customer_group'], customer_group))
+
+    return names
+
+
+def invalidate_pricing_rule_trie(doc=None, method=None):
+    """Drop the cached trie when a POS Pricing Rule changes"""
+    frappe.cache().delete_value(RULE_TRIE_CACHE_KEY)
+
+
+RULE_VERSION_CACHE_KEY = "pos_pricing_rule_version"
+
+_engine_singleton = None
+_engine_version = None
+_engine_lock = threading.Lock()
+
+
+def _get_rule_version():
+    return cint(frappe.cache().get_value(RULE_VERSION_CACHE_KEY) or 0)
+
+
+def get_pricing_engine():
+    """Get the shared PricingEngine instance
+
+    Endpoints used to construct a fresh engine per request. The instance
+    is memoized here and only rebuilt when the rule version counter says
+    the pricing rules changed.
+    """
+    global _engine_singleton, _engine_version
+
+    version = _get_rule_version()
+    with _engine_lock:
+        if _engine_singleton is None or _engine_version != version:
+            _engine_singleton = PricingEngine()
+            _engine_version = version
+        return _engine_singleton
+
+
+def bump_pricing_rule_version(doc=None, method=None):
+    """Invalidate memoized engines when a POS Pricing Rule changes"""
+    frappe.cache().set_value(RULE_VERSION_CACHE_KEY, _get_rule_version() + 1)
+
+
+MEMO_PRUNE_THRESHOLD = 4096
+
+# In-process rule cache shared by every engine instance, keyed by the
+# context digest only. The old @lru_cache on the bound method folded
+# self into the key, so each PricingEngine() got a private cache that
+# pinned the instance alive — 0% hit rate plus a leak.
+_LOCAL_RULE_CACHE = {}
+_LOCAL_RULE_CACHE_LOCK = threading.Lock()
+LOCAL_RULE_CACHE_MAX_ENTRIES = 1000
+
+
+def _memoize_ttl(func):
+    """Memoize a full price calculation per engine instance with a TTL
+
+    A POS terminal prices the same handful of SKUs thousands of times a
+    day; a hit here skips the whole rule pipeline. Entries are
+    (expiry_ts, response) tuples in self._cache keyed by the engine's
+    blake2b context digest, guarded by self._cache_lock. The instance
+    cache version is folded into the key so clear_pricing_cache can
+    invalidate everything with one integer bump.
+    """
+    @wraps(func)
+    def wrapper(self, item_code, base_price, quantity=1, total_amount=0,
+                customer=None, branch_id=None, device_id=None, **kwargs):
+        # Zero-value lines (returns, comps, voided items) cannot
+        # discount; answer before paying for key generation, the memo
+        # probe or the rule pipeline
+        if not base_price or not quantity:
+            return self._build_price_response(
+                base_price, base_price, 0, 0, None, "Zero line"
+            )
+
+        key = self._generate_cache_key(
+            item_code, quantity, total_amount, customer, branch_id,
+            base_price=flt(base_price), memo_version=self._cache_version,
+            **kwargs
+        )
+
+        now_ts = time.time()
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                expiry_ts, response = entry
+                if expiry_ts > now_ts:
+                    return response
+                del self._cache[key]
+
+        response = func(self, item_code, base_price, quantity=quantity,
+                        total_amount=total_amount, customer=customer,
+                        branch_id=branch_id, device_id=device_id, **kwargs)
+
+        with self._cache_lock:
+            if len(self._cache) >= MEMO_PRUNE_THRESHOLD:
+                # Cheap pruning pass so stale or version-bumped entries
+                # cannot grow the memo without bound
+                expired = [k for k, (expiry, _response) in self._cache.items()
+                           if expiry <= now_ts]
+                for k in expired:
+                    del self._cache[k]
+            self._cache[key] = (now_ts + self.cache_ttl, response)
+
+        return response
+
+    return wrapper
+
 
 class PricingEngine:
     """
@@ -27,40 +262,211 @@ class PricingEngine:
     
     def __init__(self):
         self.cache_ttl = 300  # 5 minutes cache TTL
+        self._cache = {}
+        self._cache_version = 0
         self._cache_lock = threading.Lock()
-        
-    @lru_cache(maxsize=1000)
+        self._rule_index = None
+        self._rule_index_built_at = 0
+        self._simple_rules_flag = None
+        self._simple_rules_checked_at = 0
+
+    def _get_rule_index(self):
+        """Feature index over active rules, rebuilt when the TTL lapses
+
+        Rules scoped by a hashable parent field (item_code, item_group,
+        brand, customer) are the "easy" bucket: a request only unions the
+        buckets matching its own feature values, so rules scoped to other
+        items or customers are never even loaded. Rules with none of
+        those scopes — including ones restricted only by time windows,
+        spend thresholds or branch child rows — stay in 'generic' and
+        always go through the full is_applicable path.
+        """
+        if self._rule_index is not None and \
+                time.time() - self._rule_index_built_at < self.cache_ttl:
+            return self._rule_index
+
+        index = {'features': defaultdict(set), 'generic': set()}
+        rows = frappe.get_all(
+            'POS Pricing Rule',
+            filters={'is_active': 1},
+            fields=['name', 'item_code', 'item_group', 'brand', 'customer']
+        )
+        for row in rows:
+            scoped = False
+            if row.item_code:
+                index['features'][f"item:{row.item_code}"].add(row.name)
+                scoped = True
+            if row.item_group:
+                index['features'][f"group:{row.item_group}"].add(row.name)
+                scoped = True
+            if row.brand:
+                index['features'][f"brand:{row.brand}"].add(row.name)
+                scoped = True
+            if row.customer:
+                index['features'][f"customer:{row.customer}"].add(row.name)
+                scoped = True
+            if not scoped:
+                index['generic'].add(row.name)
+
+        self._rule_index = index
+        self._rule_index_built_at = time.time()
+        return index
+
+    def _candidate_rule_names(self, item_code, item_info, customer):
+        """Union the index buckets that match the incoming request"""
+        index = self._get_rule_index()
+        names = set(index['generic'])
+
+        keys = []
+        if item_code:
+            keys.append(f"item:{item_code}")
+        if item_info.get('item_group'):
+            keys.append(f"group:{item_info['item_group']}")
+        if item_info.get('brand'):
+            keys.append(f"brand:{item_info['brand']}")
+        if customer:
+            keys.append(f"customer:{customer}")
+
+        for key in keys:
+            names |= index['features'].get(key, set())
+
+        return names
+
+    def _rules_are_simple(self):
+        """True when every active rule is expressible as SQL predicates
+
+        A rule is "simple" when it scopes only by item_code, validity
+        window, quantity band and spend threshold — no group/brand/
+        customer lookups, no branch or day child rows, no time-of-day
+        window. Only then can ORDER BY ... LIMIT 1 pick the winner
+        without replaying is_applicable in Python. The answer is cached
+        for the engine TTL; on any error the slow path is used.
+        """
+        if self._simple_rules_flag is not None and \
+                time.time() - self._simple_rules_checked_at < self.cache_ttl:
+            return self._simple_rules_flag
+
+        try:
+            complex_count = frappe.db.sql("""
+                SELECT COUNT(*)
+                FROM `tabPOS Pricing Rule` r
+                WHERE r.is_active = 1 AND (
+                    IFNULL(r.item_group, '') != ''
+                    OR IFNULL(r.brand, '') != ''
+                    OR IFNULL(r.customer, '') != ''
+                    OR IFNULL(r.customer_group, '') != ''
+                    OR IFNULL(r.territory, '') != ''
+                    OR IFNULL(r.from_time, '') != ''
+                    OR IFNULL(r.to_time, '') != ''
+                    OR EXISTS (SELECT 1 FROM `tabPOS Pricing Rule Branch` b
+                               WHERE b.parent = r.name)
+                    OR EXISTS (SELECT 1 FROM `tabPOS Pricing Rule Days` d
+                               WHERE d.parent = r.name)
+                )
+            """)[0][0]
+        except Exception:
+            return False
+
+        self._simple_rules_flag = cint(complex_count) == 0
+        self._simple_rules_checked_at = time.time()
+        return self._simple_rules_flag
+
+    def _try_fast_path_rule(self, item_code, quantity, total_amount):
+        """Resolve the winning rule entirely in SQL for simple rule sets
+
+        One indexed query with the full applicability predicate and
+        ORDER BY erpnext_priority DESC LIMIT 1 replaces the candidate
+        fetch, child-table loads and Python evaluation loop. Only called
+        when _rules_are_simple() proved the predicate is equivalent.
+        """
+        from erpnext_pos_integration.doctype.pos_pricing_rule.pos_pricing_rule import POSPricingRule
+
+        rows = frappe.db.sql("""
+            SELECT {columns}
+            FROM `tabPOS Pricing Rule`
+            WHERE is_active = 1
+                AND (item_code = %(item_code)s OR item_code = '' OR item_code IS NULL)
+                AND (valid_from IS NULL OR valid_from <= NOW())
+                AND (valid_upto IS NULL OR valid_upto >= NOW())
+                AND IFNULL(min_quantity, 0) <= %(quantity)s
+                AND (IFNULL(max_quantity, 0) = 0 OR max_quantity >= %(quantity)s)
+                AND IFNULL(min_spend_amount, 0) <= %(total_amount)s
+            ORDER BY erpnext_priority DESC, modified DESC
+            LIMIT 1
+        """.format(columns=", ".join(RULE_COLUMNS)), {
+            "item_code": item_code,
+            "quantity": flt(quantity),
+            "total_amount": flt(total_amount)
+        }, as_dict=True)
+
+        if not rows:
+            return None
+
+        rule = dict(rows[0])
+        rule.update({
+            'doctype': 'POS Pricing Rule',
+            'branch_conditions': [],
+            'days_of_week': []
+        })
+        rule_doc = POSPricingRule(rule)
+        rule_doc._priority_int = cint(rule_doc.priority_level)
+        return rule_doc
+
     def get_cached_pricing_rules(self, cache_key):
-        """Get pricing rules from cache"""
+        """Get pricing rules from cache
+
+        Probes the module-level in-process cache first — one dict
+        lookup, no serialization — and only falls through to Redis on a
+        miss, repopulating the local entry for the remaining TTL.
+        """
+        now_ts = time.monotonic()
+        with _LOCAL_RULE_CACHE_LOCK:
+            entry = _LOCAL_RULE_CACHE.get(cache_key)
+            if entry is not None:
+                expires_at, rules = entry
+                if now_ts < expires_at:
+                    return rules
+                del _LOCAL_RULE_CACHE[cache_key]
+
+        rules = None
         with self._cache_lock:
             try:
-                cache_entry = frappe.cache().get(cache_key)
+                cache_entry = frappe.cache().get_value(cache_key)
                 if cache_entry:
-                    cache_data = json.loads(cache_entry)
-                    if datetime.now() < datetime.fromisoformat(cache_data['expires_at']):
-                        return cache_data['rules']
-            except:
-                pass
-        return None
-    
+                    # Redis owns the expiry, so a present entry is a
+                    # valid entry — no datetime parse/compare per hit
+                    rules = _cache_loads(cache_entry)
+            except _CACHE_ERRORS as e:
+                # Surface the miss cause so APM can spot an always-miss
+                # state instead of it silently costing a DB re-fetch
+                frappe.local.pricing_cache_miss_reason = type(e).__name__
+
+        if rules is not None:
+            with _LOCAL_RULE_CACHE_LOCK:
+                _LOCAL_RULE_CACHE[cache_key] = (now_ts + self.cache_ttl, rules)
+        return rules
+
     def set_cached_pricing_rules(self, cache_key, rules, ttl=None):
         """Set pricing rules in cache"""
         if ttl is None:
             ttl = self.cache_ttl
-            
+
+        with _LOCAL_RULE_CACHE_LOCK:
+            if len(_LOCAL_RULE_CACHE) >= LOCAL_RULE_CACHE_MAX_ENTRIES:
+                _LOCAL_RULE_CACHE.clear()
+            _LOCAL_RULE_CACHE[cache_key] = (time.monotonic() + ttl, rules)
+
         with self._cache_lock:
             try:
-                expires_at = (datetime.now() + timedelta(seconds=ttl)).isoformat()
-                cache_data = {
-                    'rules': rules,
-                    'expires_at': expires_at,
-                    'created_at': datetime.now().isoformat()
-                }
-                frappe.cache().set(cache_key, json.dumps(cache_data))
+                # Expiry lives in Redis (SETEX) instead of an embedded
+                # expires_at field that every read would have to parse
+                frappe.cache().set_value(cache_key, _cache_dumps(rules),
+                                         expires_in_sec=ttl)
             except Exception as e:
                 frappe.log_error(f"Cache write error: {str(e)}", "Pricing Engine Cache")
     
-    def calculate_price(self, item_code, base_price, quantity=1, total_amount=0, 
+    @_memoize_ttl
+    def calculate_price(self, item_code, base_price, quantity=1, total_amount=0,
                        customer=None, branch_id=None, device_id=None, **kwargs):
         """
         Calculate final price using 8-level hierarchy pricing engine
@@ -81,13 +487,16 @@ class PricingEngine:
         start_time = time.time()
         
         try:
-            # Generate cache key based on context
-            cache_key = self._generate_cache_key(item_code, quantity, total_amount, 
-                                               customer, branch_id, **kwargs)
-            
-            # Get applicable pricing rules with caching
+            # Rule-set cache key: quantity and amounts are deliberately
+            # excluded so every line of the same item/customer/branch
+            # shape shares one cached candidate set
+            cache_key = self._rule_cache_key(item_code, customer, branch_id)
+
+            # Get applicable pricing rules with caching; only the winning
+            # rule is needed here, so evaluation stops at the first match
             applicable_rules = self.get_applicable_pricing_rules(
-                item_code, quantity, total_amount, customer, branch_id, cache_key
+                item_code, quantity, total_amount, customer, branch_id, cache_key,
+                first_match_only=True
             )
             
             if not applicable_rules:
@@ -117,18 +526,59 @@ class PricingEngine:
                 base_price, base_price, 0, 0, None, f"Calculation error: {str(e)}"
             )
     
-    def calculate_bulk_prices(self, items_data, customer=None, branch_id=None, device_id=None):
+    def calculate_bulk_prices(self, items_data, customer=None, branch_id=None,
+                             device_id=None, prefetched_rules=None):
         """
         Calculate prices for multiple items efficiently
-        
+
         Args:
             items_data (list): List of dicts with item_code, quantity, base_price
             customer (str): Customer ID (optional)
             branch_id (str): Branch ID (optional)
             device_id (str): Device ID (optional)
-        
+            prefetched_rules (dict): item_code -> list of rule docs already
+                fetched for the batch; items are then priced in memory
+                instead of one rule query per item (optional)
+
+        Returns:
+            dict: Bulk calculation results with item-by-item breakdown
+        """
+        # Transpose the row dicts once and run the columnar path, so the
+        # hot loop iterates flat lists instead of a dict per line
+        return self.calculate_prices_columnar(
+            item_codes=[item['item_code'] for item in items_data],
+            base_prices=[item.get('base_price', 0) for item in items_data],
+            quantities=[item.get('quantity', 1) for item in items_data],
+            customer=customer,
+            branch_id=branch_id,
+            device_id=device_id,
+            prefetched_rules=prefetched_rules
+        )
+
+    def calculate_prices_columnar(self, item_codes, base_prices, quantities,
+                                  customer=None, branch_id=None,
+                                  device_id=None, prefetched_rules=None):
+        """
+        Calculate prices for a batch given as parallel columns
+
+        Args:
+            item_codes (list): Item code per cart line
+            base_prices (list): Base price per cart line
+            quantities (list): Quantity per cart line
+            customer (str): Customer ID (optional)
+            branch_id (str): Branch ID (optional)
+            device_id (str): Device ID (optional)
+            prefetched_rules (dict): item_code -> list of rule docs already
+                fetched for the batch; items are then priced in memory
+                instead of one rule query per item (optional)
+
         Returns:
             dict: Bulk calculation results with item-by-item breakdown
+
+        The struct-of-arrays layout keeps key building and totals on flat
+        list iteration, and a per-line dict is only materialized for each
+        distinct (item_code, base_price, quantity) line that is actually
+        priced, not for every row of the cart.
         """
         start_time = time.time()
         results = {
@@ -137,17 +587,34 @@ class PricingEngine:
             'total_final': 0,
             'total_discount': 0,
             'calculation_time': 0,
-            'rules_applied': set()
+            # name -> number of lines the rule hit; callers get usage
+            # counts for free and no set/list conversion pass is needed
+            'rules_applied': {}
         }
-        
+
         total_transaction_amount = sum(
-            item.get('base_price', 0) * item.get('quantity', 1) 
-            for item in items_data
+            base_price * quantity
+            for base_price, quantity in zip(base_prices, quantities)
         )
-        
+
         try:
-            for item_data in items_data:
-                item_result = self.calculate_price(
+            if len(item_codes) > 1:
+                # One metadata query warms the request-scope item cache
+                # for every line in the basket
+                self._batch_get_item_info(item_codes)
+
+            if prefetched_rules is None and len(item_codes) > 1:
+                # One candidate fetch for the whole batch instead of a
+                # rule query per item inside calculate_price
+                prefetched_rules = self._prefetch_rules_for_batch(item_codes)
+
+            def _price_item(item_data):
+                if prefetched_rules is not None:
+                    return self._calculate_from_prefetched(
+                        item_data, prefetched_rules, total_transaction_amount,
+                        customer, branch_id
+                    )
+                return self.calculate_price(
                     item_code=item_data['item_code'],
                     base_price=item_data['base_price'],
                     quantity=item_data.get('quantity', 1),
@@ -156,22 +623,46 @@ class PricingEngine:
                     branch_id=branch_id,
                     device_id=device_id
                 )
-                
+
+            # Identical (item_code, base_price, quantity) lines price
+            # identically within one batch, so each distinct line is
+            # computed once and the results fanned back out
+            keys = list(zip(item_codes, base_prices, quantities))
+            unique_items = {}
+            for key in keys:
+                if key not in unique_items:
+                    unique_items[key] = {
+                        'item_code': key[0],
+                        'base_price': key[1],
+                        'quantity': key[2]
+                    }
+
+            # Evaluation stays on the request thread: is_applicable can
+            # fall back to item/customer lookups whose frappe.local
+            # caches (and DB connection) are thread-local, so worker
+            # threads would start cold or fail outright
+            unique_results = {key: _price_item(item_data)
+                              for key, item_data in unique_items.items()}
+
+            item_results = [unique_results[key] for key in keys]
+
+            for item_code, quantity, item_result in zip(item_codes, quantities, item_results):
                 results['items'].append({
-                    'item_code': item_data['item_code'],
-                    'quantity': item_data.get('quantity', 1),
+                    'item_code': item_code,
+                    'quantity': quantity,
                     **item_result
                 })
                 
                 results['total_original'] += item_result['original_price']
                 results['total_final'] += item_result['final_price']
                 results['total_discount'] += item_result['discount_amount']
-                if item_result.get('rule_applied'):
-                    results['rules_applied'].add(item_result['rule_applied'])
-            
+                rule_applied = item_result.get('rule_applied')
+                if rule_applied:
+                    results['rules_applied'][rule_applied] = \
+                        results['rules_applied'].get(rule_applied, 0) + 1
+
             results['calculation_time'] = time.time() - start_time
-            results['rules_applied'] = list(results['rules_applied'])
-            
+
             return results
             
         except Exception as e:
@@ -185,19 +676,209 @@ class PricingEngine:
                 'error': str(e)
             }
     
-    def get_applicable_pricing_rules(self, item_code, quantity, total_amount, 
-                                   customer, branch_id, cache_key=None):
+    def _prefetch_rules_for_batch(self, item_codes):
+        """Load the union of candidate rules for a batch in one pass
+
+        Returns item_code -> ordered rule docs, so each line is priced
+        from memory; rule fetches drop from one per line to one per
+        batch regardless of cart size.
+        """
+        item_codes = list(set(item_codes))
+        rows = frappe.db.sql("""
+            SELECT {columns}
+            FROM `tabPOS Pricing Rule`
+            WHERE is_active = 1
+                AND (item_code IN %(codes)s OR item_code = '' OR item_code IS NULL)
+            ORDER BY erpnext_priority DESC, modified DESC
+        """.format(columns=", ".join(RULE_COLUMNS)),
+            {"codes": item_codes}, as_dict=True)
+
+        rule_docs = self._bulk_load_rules(rows)
+        rule_docs.sort(key=lambda rule_doc: -rule_doc._priority_int)
+
+        prefetched_rules = {code: [] for code in item_codes}
+        for rule_doc in rule_docs:
+            if rule_doc.item_code:
+                if rule_doc.item_code in prefetched_rules:
+                    prefetched_rules[rule_doc.item_code].append(rule_doc)
+            else:
+                # Generic rule: candidate for every item in the batch
+                for code in item_codes:
+                    prefetched_rules[code].append(rule_doc)
+
+        return prefetched_rules
+
+    def _calculate_from_prefetched(self, item_data, prefetched_rules,
+                                  total_amount, customer, branch_id):
+        """Price one item against rules already fetched for the batch
+
+        The candidate lists are ordered by erpnext_priority, so the first
+        applicable rule wins — no per-item rule query needed.
+        """
+        base_price = item_data['base_price']
+        quantity = item_data.get('quantity', 1)
+
+        # Zero-value lines (returns, comps, voided items) cannot
+        # discount; skip rule evaluation outright
+        if not base_price or not quantity:
+            return self._build_price_response(
+                base_price, base_price, 0, 0, None, "Zero line"
+            )
+
+        transaction_context = {
+            'item_code': item_data['item_code'],
+            'branch_id': branch_id,
+            'customer': customer,
+            'quantity': quantity,
+            'total_amount': total_amount
+        }
+
+        for rule in prefetched_rules.get(item_data['item_code'], []):
+            if rule.is_applicable(transaction_context):
+                return self._apply_pricing_rule(rule, base_price, quantity, total_amount)
+
+        return self._build_price_response(
+            base_price, base_price, 0, 0, None, "No pricing rules applicable"
+        )
+
+    def get_applicable_pricing_rules(self, item_code, quantity, total_amount,
+                                   customer, branch_id, cache_key=None,
+                                   first_match_only=False):
         """
         Get all applicable pricing rules for given context with caching
+
+        With first_match_only the scan stops at the first applicable rule
+        in priority order — the common case where a high-priority rule
+        matches never evaluates the rest of the candidates.
+
+        The cache holds the *candidate* set for the item/customer/branch
+        shape, not the filtered result: quantity, amounts and time only
+        matter inside is_applicable, which runs on every call, so one
+        cached entry serves every quantity of the same item.
         """
-        # Try to get from cache first
+        # Fast path: when every active rule is provably simple, one
+        # indexed LIMIT 1 query picks the winner and the Python
+        # evaluation loop never runs
+        if first_match_only and self._rules_are_simple():
+            winner = self._try_fast_path_rule(item_code, quantity, total_amount)
+            return [winner] if winner else []
+
+        item_info = self._get_item_info(item_code)
+
+        # Try to get the candidate set from cache first
+        rule_docs = None
         if cache_key:
             cached_rules = self.get_cached_pricing_rules(cache_key)
             if cached_rules:
-                return self._convert_to_doc_objects(cached_rules)
-        
-        # Build query filters for performance
-    
+                rule_docs = self._rules_from_cache(cached_rules)
+
+        if rule_docs is None:
+            # Pre-filter through the feature index: only rules scoped to
+            # this request's item/group/brand/customer (plus the generic
+            # bucket) are fetched and evaluated at all
+            candidate_names = self._candidate_rule_names(item_code, item_info, customer)
+            if not candidate_names:
+                return []
+
+            filters = {
+                'is_active': 1,
+                'name': ['in', sorted(candidate_names)]
+            }
+
+            # Fetch only the columns applicability and pricing need in
+            # one query and materialize the documents locally instead of
+            # one frappe.get_doc round-trip per candidate
+            rules = frappe.get_all(
+                'POS Pricing Rule',
+                filters=filters,
+                fields=RULE_COLUMNS,
+                order_by='erpnext_priority desc, modified desc',
+                limit=50  # Limit to prevent performance issues
+            )
+
+            rule_docs = self._bulk_load_rules(rules)
+            rule_docs.sort(key=lambda rule_doc: -rule_doc._priority_int)
+
+            # Cache the candidate set (only if not too many)
+            if cache_key and rule_docs and len(rule_docs) <= 10:
+                cache_data = [rule_doc.as_dict() for rule_doc in rule_docs]
+                self.set_cached_pricing_rules(cache_key, cache_data)
+
+        current_time, current_date = _request_clock()
+        transaction_context = {
+            'item_code': item_code,
+            'branch_id': branch_id,
+            'customer': customer,
+            'quantity': quantity,
+            'total_amount': total_amount,
+            'item_info': item_info,
+            'current_time': current_time,
+            'current_date': current_date
+        }
+
+        # Highest level first: priority 8 (Manual Override) always wins
+        # under the lexicographic scheme, so the first applicable rule in
+        # this order is the winner
+        applicable_rules = []
+        for rule_doc in rule_docs:
+            if rule_doc.is_applicable(transaction_context):
+                applicable_rules.append(rule_doc)
+                if first_match_only:
+                    break
+
+        return applicable_rules
+
+    def _bulk_load_rules(self, rule_rows):
+        """Materialize rule documents from already-fetched parent rows
+
+        The parent fields are in hand from the candidate query, so only
+        the two restriction child tables are fetched — one query each,
+        filtered by parent IN names — and grouped in Python before the
+        in-memory documents are built. is_applicable and calculate_price
+        work unchanged with zero per-rule queries.
+        """
+        if not rule_rows:
+            return []
+
+        from erpnext_pos_integration.doctype.pos_pricing_rule.pos_pricing_rule import POSPricingRule
+
+        names = [row.name for row in rule_rows]
+        branches_by_parent = defaultdict(list)
+        for row in frappe.get_all('POS Pricing Rule Branch',
+                filters={'parent': ['in', names]},
+                fields=['parent', 'branch_id']):
+            branches_by_parent[row.parent].append({'branch_id': row.branch_id})
+
+        days_by_parent = defaultdict(list)
+        for row in frappe.get_all('POS Pricing Rule Days',
+                filters={'parent': ['in', names]},
+                fields=['parent', 'day_of_week']):
+            days_by_parent[row.parent].append({'day_of_week': row.day_of_week})
+
+        rule_docs = []
+        for row in rule_rows:
+            rule = dict(row)
+            rule.update({
+                'doctype': 'POS Pricing Rule',
+                'branch_conditions': branches_by_parent.get(row.name, []),
+                'days_of_week': days_by_parent.get(row.name, [])
+            })
+            rule_doc = POSPricingRule(rule)
+            # Numeric priority resolved once here so the resolution scan
+            # compares plain ints instead of re-parsing the string field
+            rule_doc._priority_int = cint(rule_doc.priority_level)
+            rule_docs.append(rule_doc)
+
+        return rule_docs
+
+    def _get_highest_priority_rule(self, applicable_rules):
+        """Get the highest priority rule from applicable rules"""
+        if not applicable_rules:
+            return None
+
+        # Rules are already ordered by priority desc, so first is highest
+        return applicable_rules[0]
+
     def _apply_pricing_rule(self, rule, base_price, quantity, total_amount, **kwargs):
         """Apply specific pricing rule and calculate final price"""
         if not rule:
@@ -258,45 +939,111 @@ class PricingEngine:
         return response
     
     def _generate_cache_key(self, item_code, quantity, total_amount, customer, branch_id, **kwargs):
-        """Generate cache key for pricing context"""
-        key_parts = [
-            'pricing',
-            item_code,
-            quantity,
-            total_amount,
-            customer or 'none',
-            branch_id or 'none'
-        ]
-        
+        """Generate cache key for pricing context
+
+        The components are folded into a fixed-size blake2b digest
+        instead of being joined into one variable-length string, so the
+        key stays 32 hex chars no matter how long the customer or branch
+        identifiers get and lookups compare constant-size keys.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update((item_code or '').encode())
+        h.update(b'|')
+        h.update(struct.pack('<dd', flt(quantity), flt(total_amount)))
+        h.update((customer or '').encode())
+        h.update(b'|')
+        h.update((branch_id or '').encode())
+
         # Add additional context parameters
         for key, value in sorted(kwargs.items()):
             if value is not None:
-                key_parts.append(f"{key}:{value}")
-        
-        return '|'.join(map(str, key_parts))
+                h.update(f"|{key}:{value}".encode())
+
+        return 'pricing|' + h.hexdigest()
     
+    def _rule_cache_key(self, item_code, customer, branch_id):
+        """Cache key for the candidate-rule set of one item context
+
+        Quantity and amounts are deliberately excluded: they change per
+        cart line but never change which rules are candidates, so every
+        quantity of the same item shares one cached rule set and the
+        thresholds are applied at evaluation time instead.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update((item_code or '').encode())
+        h.update(b'|')
+        h.update((customer or '').encode())
+        h.update(b'|')
+        h.update((branch_id or '').encode())
+        return 'pricing|rules|' + h.hexdigest()
+
+    def _batch_get_item_info(self, item_codes):
+        """Fetch item metadata for a whole basket in one query
+
+        One get_all covers every code the request-scope cache on
+        frappe.local has not seen yet, so the per-line _get_item_info
+        calls below become plain dict hits — one query per basket
+        instead of one per unique line on a cold process cache.
+        """
+        local_cache = getattr(frappe.local, 'pos_item_info_cache', None)
+        if local_cache is None:
+            local_cache = frappe.local.pos_item_info_cache = {}
+
+        missing = [code for code in set(item_codes)
+                   if code and code not in local_cache]
+        if missing:
+            rows = frappe.get_all(
+                'Item',
+                filters={'name': ['in', missing]},
+                fields=['name', 'item_group', 'brand', 'stock_uom', 'item_name']
+            )
+            for row in rows:
+                info = dict(row)
+                name = info.pop('name')
+                local_cache[name] = info
+            for code in missing:
+                # Unknown codes cache as empty so they are not re-queried
+                local_cache.setdefault(code, {})
+
+        return local_cache
+
     def _get_item_info(self, item_code):
         """Get item information for context"""
         if not item_code:
             return {}
-        
+
+        local_cache = getattr(frappe.local, 'pos_item_info_cache', None)
+        if local_cache is not None and item_code in local_cache:
+            return local_cache[item_code]
+
         try:
-            return frappe.get_value(
-                'Item',
-                item_code,
-                ['item_group', 'brand', 'stock_uom', 'item_name'],
-                as_dict=True
-            ) or {}
-        except:
+            return _fetch_item_info(item_code)
+        except (frappe.DoesNotExistError, TypeError, ValueError):
             return {}
-    
-    def _convert_to_doc_objects(self, rules_data):
-        """Convert cached rule data back to doc objects"""
-        try:
-            return [frappe.get_doc('POS Pricing Rule', rule['name']) for rule in rules_data]
-        except:
-            return []
-    
+
+    def _rules_from_cache(self, cached_rules):
+        """Rebuild in-memory rule docs from cached candidate dicts
+
+        The cached entries are full as_dict payloads including the
+        restriction child rows, so no query is needed — same idea as
+        _bulk_load_rules but starting from the cache.
+        """
+        from erpnext_pos_integration.doctype.pos_pricing_rule.pos_pricing_rule import POSPricingRule
+
+        rule_docs = []
+        for rule in cached_rules:
+            rule_doc = POSPricingRule(rule)
+            # The JSON round-trip turns the Datetime fields into ISO
+            # strings; coerce them back so _is_time_valid compares
+            # datetimes instead of raising on datetime < str
+            if rule_doc.valid_from:
+                rule_doc.valid_from = get_datetime(rule_doc.valid_from)
+            if rule_doc.valid_upto:
+                rule_doc.valid_upto = get_datetime(rule_doc.valid_upto)
+            rule_doc._priority_int = cint(rule_doc.priority_level)
+            rule_docs.append(rule_doc)
+        return rule_docs
+
     def validate_pricing_configuration(self):
         """
         Validate pricing engine configuration and return status
@@ -347,6 +1094,31 @@ class PricingEngine:
                 'issues': [f"Configuration validation error: {str(e)}"]
             }
 
+@lru_cache(maxsize=4096)
+def _fetch_item_info(item_code):
+    """Fetch item metadata for one code, memoized process-wide
+
+    Pure metadata lookup: a 50-line cart repricing the same SKUs costs
+    at most one query per unique item instead of one per line. The
+    cache is dropped from the Item on_update/on_trash hooks. The
+    lookup itself goes through frappe.db.get_value with cache=True, so
+    a miss here still hits Frappe's shared document cache before the
+    database.
+    """
+    return frappe.db.get_value(
+        'Item',
+        item_code,
+        ['item_group', 'brand', 'stock_uom', 'item_name'],
+        as_dict=True,
+        cache=True
+    ) or {}
+
+
+def clear_item_info_cache(doc=None, method=None):
+    """Drop memoized item metadata when an Item changes"""
+    _fetch_item_info.cache_clear()
+
+
 # Utility functions for easy access
 @frappe.whitelist()
 def calculate_item_price(item_code, base_price, quantity=1, total_amount=0, 
@@ -354,7 +1126,7 @@ def calculate_item_price(item_code, base_price, quantity=1, total_amount=0,
     """
     Calculate price for a single item using pricing engine
     """
-    engine = PricingEngine()
+    engine = get_pricing_engine()
     return engine.calculate_price(
         item_code=item_code,
         base_price=base_price,
@@ -370,7 +1142,7 @@ def calculate_bulk_item_prices(items_data, customer=None, branch_id=None, device
     """
     Calculate prices for multiple items
     """
-    engine = PricingEngine()
+    engine = get_pricing_engine()
     
     # Parse items_data if it's a string
     if isinstance(items_data, str):
@@ -394,7 +1166,7 @@ def get_pricing_engine_status():
     """
     Get pricing engine health and configuration status
     """
-    engine = PricingEngine()
+    engine = get_pricing_engine()
     return engine.validate_pricing_configuration()
 
 @frappe.whitelist()
@@ -404,72 +1176,43 @@ def clear_pricing_cache():
     """
     try:
         cache = frappe.cache()
-        keys = cache.get_keys('pricing|')
-        for key in keys:
-            cache.delete(key)
-        
+
+        # SCAN walks the keyspace in cursor-sized steps and pipelined
+        # UNLINK frees the values off the main Redis thread, instead of
+        # one blocking KEYS enumeration plus a DELETE round-trip per key
+        cleared = 0
+        try:
+            pipe = cache.pipeline()
+            pending = 0
+            for key in cache.scan_iter(match=cache.make_key('pricing|*'), count=500):
+                pipe.unlink(key)
+                pending += 1
+                cleared += 1
+                if pending >= 500:
+                    pipe.execute()
+                    pending = 0
+            if pending:
+                pipe.execute()
+        except Exception:
+            cache.delete_keys('pricing|')
+
+        with _LOCAL_RULE_CACHE_LOCK:
+            _LOCAL_RULE_CACHE.clear()
+
+        # Invalidate the in-process calculate_price memo in O(1): the
+        # version bump changes every future key, and the stale entries
+        # age out of the dict via TTL/pruning
+        engine = _engine_singleton
+        if engine is not None:
+            with engine._cache_lock:
+                engine._cache_version += 1
+
         return {
             'status': 'success',
-            'message': f"Cleared {len(keys)} cache entries"
+            'message': f"Cleared {cleared} cache entries"
         }
     except Exception as e:
         return {
             'status': 'error',
             'message': f"Cache clear error: {str(e)}"
-        }
-        filters = {
-            'is_active': 1,
-            'item_code': ['in', [item_code, '']],  # Include rules with no specific item
-        }
-        
-        # Add item group and brand filters if needed
-        item_info = self._get_item_info(item_code)
-        if item_info:
-            if item_info.get('item_group'):
-                filters['item_group'] = ['in', [item_info['item_group'], '']]
-            if item_info.get('brand'):
-                filters['brand'] = ['in', [item_info['brand'], '']]
-        
-        # Get pricing rules ordered by priority (highest first)
-        rules = frappe.get_all(
-            'POS Pricing Rule',
-            filters=filters,
-            fields=['*'],
-            order_by='erpnext_priority desc, modified desc',
-            limit=50  # Limit to prevent performance issues
-        )
-        
-        applicable_rules = []
-        transaction_context = {
-            'item_code': item_code,
-            'branch_id': branch_id,
-            'customer': customer,
-            'quantity': quantity,
-            'total_amount': total_amount,
-            'item_info': item_info,
-            'current_time': now(),
-            'current_date': getdate()
-        }
-        
-        for rule_data in rules:
-            try:
-                rule_doc = frappe.get_doc('POS Pricing Rule', rule_data.name)
-                if rule_doc.is_applicable(transaction_context):
-                    applicable_rules.append(rule_doc)
-                    # Cache the applicable rules
-                    if cache_key and len(applicable_rules) <= 10:  # Cache only if not too many
-                        cache_data = [rule_doc.as_dict() for rule_doc in applicable_rules]
-                        self.set_cached_pricing_rules(cache_key, cache_data)
-            except Exception as e:
-                frappe.log_error(f"Error processing rule {rule_data.name}: {str(e)}", "Pricing Engine")
-                continue
-        
-        return applicable_rules
-    
-    def _get_highest_priority_rule(self, applicable_rules):
-        """Get the highest priority rule from applicable rules"""
-        if not applicable_rules:
-            return None
-        
-        # Rules are already ordered by priority desc, so first is highest
-        return applicable_rules[0]
\ No newline at end of file
+        }
\ No newline at end of file
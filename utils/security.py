@@ -0,0 +1,16 @@
+# Copyright (c) 2025, ERPNext and contributors
+# For license information, please see license.txt
+
+import hmac
+
+
+def safe_eq(a, b):
+    """Compare two secrets in constant time
+
+    Plain == on device secrets (API keys, API secrets, registration
+    codes) leaks how many leading bytes matched through response timing,
+    so every secret comparison must go through this helper instead.
+    None is treated as the empty string so missing values simply fail
+    the comparison.
+    """
+    return hmac.compare_digest(str(a or "").encode(), str(b or "").encode())